@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage, QColor
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+from annotation.annotator import AnnotationWindow
+
+def make_images(directory: Path, count: int, width: int, height: int):
+    for i in range(count):
+        image = QImage(width, height, QImage.Format_RGB32)
+        image.fill(QColor((i * 37) % 255, (i * 91) % 255, (i * 53) % 255))
+        image.save(str(directory / f"synthetic_frame_{i:05d}.jpg"), "JPG", 95)
+
+def wait(app, seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+
+def measure(app, image_dir: Path, label_dir: Path, prefetch: int, steps: int, dwell: float, downscale: bool):
+    window = AnnotationWindow(prefetch=prefetch, downscale=downscale)
+    window.resize(1400, 900)
+    window.show()
+    window.open_directory(image_dir)
+    window.label_dir = label_dir
+    wait(app, dwell)
+
+    timings = []
+    for _ in range(min(steps, len(window.image_files) - 1)):
+        started = time.perf_counter()
+        window.next_image()
+        window.image_label.repaint()
+        timings.append((time.perf_counter() - started) * 1000)
+        wait(app, dwell)
+
+    window.image_cache.wait()
+    window.close()
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=Path, default=None)
+    parser.add_argument("--count", type=int, default=40)
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--prefetch", type=int, default=4)
+    parser.add_argument("--dwell-ms", type=float, default=300)
+    parser.add_argument("--downscale", action="store_true")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as tmp:
+        image_dir = args.images
+        if image_dir is None:
+            image_dir = Path(tmp) / "images"
+            image_dir.mkdir()
+            make_images(image_dir, args.count, args.width, args.height)
+        label_dir = Path(tmp) / "labels"
+        label_dir.mkdir()
+
+        for prefetch in (0, args.prefetch):
+            timings = measure(app, image_dir, label_dir, prefetch, args.steps, args.dwell_ms / 1000, args.downscale)
+            print(f"prefetch={prefetch}: switch-to-paint mean {statistics.mean(timings):.1f} ms, "
+                  f"p50 {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms")
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QPixmap, QPainter, QPen, QColor, QFont
+from PyQt5.QtCore import Qt, QPoint, QPointF, QRect
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+from annotation.annotator import AnnotationWindow, ZoomPanLabel
+
+class LegacyZoomPanLabel(ZoomPanLabel):
+    def mouseMoveEvent(self, event):
+        if self.drawing:
+            self.end_point = self.screen_to_image_coords(event.pos()).toPoint()
+            self.update()
+        else:
+            super().mouseMoveEvent(event)
+
+    def paintEvent(self, event):
+        if self._pixmap.isNull(): return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        target_rect = QRect(self.offset.toPoint(), (self._pixmap.size() * self.scale))
+        painter.drawPixmap(target_rect, self._pixmap)
+        pen_rect = QPen(QColor(82, 139, 255), 2, Qt.SolidLine)
+        pen_rect.setCosmetic(True)
+        painter.setPen(pen_rect)
+        for box in self.parent_window.boxes:
+            box_rect_img = box['rect']
+            top_left_screen = self.image_to_screen_coords(QPointF(box_rect_img.topLeft()))
+            bottom_right_screen = self.image_to_screen_coords(QPointF(box_rect_img.bottomRight()))
+            screen_rect = QRect(top_left_screen.toPoint(), bottom_right_screen.toPoint())
+            painter.drawRect(screen_rect)
+            painter.setFont(QFont('Arial', 12, QFont.Bold))
+            painter.drawText(screen_rect.topLeft() - QPoint(0, 5), box['label'])
+        if self.drawing:
+            top_left_screen = self.image_to_screen_coords(QPointF(self.start_point))
+            bottom_right_screen = self.image_to_screen_coords(QPointF(self.end_point))
+            painter.drawRect(QRect(top_left_screen.toPoint(), bottom_right_screen.toPoint()))
+
+def random_boxes(count: int, width: int, height: int, labels, rng):
+    boxes = []
+    for _ in range(count):
+        w, h = rng.randint(20, 300), rng.randint(20, 300)
+        boxes.append({'rect': QRect(rng.randint(0, width - w), rng.randint(0, height - h), w, h),
+                      'label': rng.choice(labels)})
+    return boxes
+
+def time_rubber_band(label, frames: int):
+    label.drawing = True
+    label.start_point = QPoint(100, 100)
+    label.end_point = QPoint(100, 100)
+    timings = []
+    for i in range(frames):
+        old_rect = label.drawing_rect()
+        label.end_point = QPoint(100 + 10 * i, 100 + 6 * i)
+        started = time.perf_counter()
+        if isinstance(label, LegacyZoomPanLabel):
+            label.repaint()
+        else:
+            label.repaint(old_rect.united(label.drawing_rect()).adjusted(-3, -3, 3, 3))
+        timings.append((time.perf_counter() - started) * 1000)
+    label.drawing = False
+    return statistics.median(timings)
+
+def time_full_paint(label, frames: int):
+    timings = []
+    for _ in range(frames):
+        started = time.perf_counter()
+        label.repaint()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--counts", type=int, nargs="+", default=[0, 25, 100, 250, 500, 1000])
+    parser.add_argument("--frames", type=int, default=30)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    window = AnnotationWindow(prefetch=0)
+    window.resize(1400, 900)
+    window.show()
+    app.processEvents()
+
+    pixmap = QPixmap(args.width, args.height)
+    pixmap.fill(QColor(90, 90, 90))
+    labels = window.classes or ['object']
+
+    print(f"{'boxes':>6} {'legacy full':>12} {'new full':>10} {'legacy band':>12} {'new band':>10}  (median ms)")
+    for count in args.counts:
+        window.boxes = random_boxes(count, args.width, args.height, labels, random.Random(count))
+        results = []
+        for label_class in (LegacyZoomPanLabel, ZoomPanLabel):
+            label = label_class(window)
+            label.resize(window.image_label.size())
+            label.show()
+            label.setPixmap(pixmap)
+            label.repaint()
+            results.append((time_full_paint(label, args.frames), time_rubber_band(label, args.frames)))
+            label.hide()
+            label.deleteLater()
+        print(f"{count:>6} {results[0][0]:>12.2f} {results[1][0]:>10.2f} {results[0][1]:>12.2f} {results[1][1]:>10.2f}")
+    window.close()
@@ -0,0 +1,50 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+from ultralytics.cfg import get_cfg
+from ultralytics.data import build_dataloader, build_yolo_dataset
+from ultralytics.data.utils import check_det_dataset
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+from training.packed_dataset import pack_dataset, build_packed_dataset
+
+def time_epochs(dataset, batch: int, workers: int, epochs: int):
+    loader = build_dataloader(dataset, batch, workers, shuffle=True)
+    timings = []
+    for _ in range(epochs):
+        images = 0
+        started = time.perf_counter()
+        for batch_data in loader:
+            images += len(batch_data['im_file'])
+        timings.append((time.perf_counter() - started, images))
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", type=Path, default=PROJECT_ROOT / "data/processed/dataset.yaml")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--mode", choices=["train", "val"], default="train")
+    args = parser.parse_args()
+
+    cfg = get_cfg(overrides={"data": str(args.data), "imgsz": args.imgsz})
+    data = check_det_dataset(str(args.data))
+    img_path = data[args.mode]
+
+    started = time.perf_counter()
+    pack_dataset(Path(data["path"]), imgsz=args.imgsz, workers=args.workers)
+    print(f"pack step: {time.perf_counter() - started:.1f} s")
+
+    datasets = {
+        "jpeg folders": build_yolo_dataset(cfg, img_path, args.batch, data, mode=args.mode),
+        "packed store": build_packed_dataset(cfg, img_path, args.batch, data, mode=args.mode)
+    }
+    print(f"{'loader':<13} {'epoch':>5} {'seconds':>8} {'img/s':>8}")
+    for name, dataset in datasets.items():
+        for epoch, (seconds, images) in enumerate(time_epochs(dataset, args.batch, args.workers, args.epochs)):
+            print(f"{name:<13} {epoch:>5} {seconds:>8.1f} {images / seconds:>8.1f}")
@@ -0,0 +1,64 @@
+import cv2
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+from data_preparation.extract_frames import extract_frames_from_videos, find_videos, count_video_frames
+
+def legacy_extract(video_dir: Path, output_dir: Path, frame_stride: int):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for video_path in find_videos(video_dir):
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            continue
+        frame_count = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_count % frame_stride == 0:
+                cv2.imwrite(str(output_dir / f"{video_path.stem}_frame_{frame_count:05d}.jpg"), frame)
+            frame_count += 1
+        cap.release()
+
+def run_benchmark(video_dir: Path, frame_stride: int, workers: int, chunk_frames: int):
+    total_frames = sum(count_video_frames(p) for p in find_videos(video_dir))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_dir = Path(tmp) / "legacy"
+        started = time.perf_counter()
+        legacy_extract(video_dir, legacy_dir, frame_stride)
+        results['legacy'] = total_frames / max(time.perf_counter() - started, 1e-9)
+
+        engine_dir = Path(tmp) / "engine"
+        started = time.perf_counter()
+        extract_frames_from_videos(video_dir, engine_dir, frame_stride, workers=workers, chunk_frames=chunk_frames)
+        results['engine'] = total_frames / max(time.perf_counter() - started, 1e-9)
+
+        legacy_names = sorted(p.name for p in legacy_dir.glob("*.jpg"))
+        engine_names = sorted(p.name for p in engine_dir.glob("*.jpg"))
+        results['identical_names'] = legacy_names == engine_names
+        shutil.rmtree(legacy_dir)
+        shutil.rmtree(engine_dir)
+
+    return total_frames, results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video-dir", type=Path, default=PROJECT_ROOT / "data/raw")
+    parser.add_argument("--stride", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-frames", type=int, default=3600)
+    args = parser.parse_args()
+
+    total_frames, results = run_benchmark(args.video_dir, args.stride, args.workers, args.chunk_frames)
+    print(f"source frames: {total_frames}")
+    print(f"legacy loop:   {results['legacy']:.1f} frames/s")
+    print(f"seek + pool:   {results['engine']:.1f} frames/s ({results['engine'] / max(results['legacy'], 1e-9):.2f}x)")
+    print(f"identical output names: {results['identical_names']}")
@@ -0,0 +1,73 @@
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+from ultralytics import YOLO
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+from evaluation.video_pipeline import VideoPipeline, TrackingVideoPipeline, VIDEO_EXTENSIONS
+from evaluation.metrics import evaluate_detections
+
+class RecordingPipeline(VideoPipeline):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.frames = []
+
+    def render(self, frame, result):
+        boxes = result.boxes
+        self.frames.append((boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy()))
+        return super().render(frame, result)
+
+class RecordingTrackingPipeline(TrackingVideoPipeline):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.frames = []
+
+    def track(self, result):
+        tracks = super().track(result)
+        self.frames.append((
+            [box for _, box, _, _ in tracks],
+            [confidence for _, _, confidence, _ in tracks],
+            [class_id for _, _, _, class_id in tracks]
+        ))
+        return tracks
+
+def benchmark_clip(model, clip: Path, output_dir: Path, args):
+    reference = RecordingPipeline(model, conf=args.conf, batch_size=args.batch)
+    reference_report = reference.run(clip, output_dir / f"{clip.stem}_reference.mp4")
+
+    tracked = RecordingTrackingPipeline(model, conf=args.conf, batch_size=args.batch,
+                                        detect_every=args.detect_every, motion_threshold=args.motion_threshold)
+    tracked_report = tracked.run(clip, output_dir / f"{clip.stem}_tracked.mp4")
+
+    records = [
+        (pred_boxes, pred_conf, pred_cls, ref_boxes, ref_cls)
+        for (pred_boxes, pred_conf, pred_cls), (ref_boxes, _, ref_cls) in zip(tracked.frames, reference.frames)
+    ]
+    metrics = evaluate_detections(records, num_classes=len(model.names))
+    return reference_report, tracked_report, metrics
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=Path, default=PROJECT_ROOT / "runs/detect/yolov11m_food_exp_hpo/weights/best.pt")
+    parser.add_argument("--video-dir", type=Path, default=PROJECT_ROOT / "data/raw")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--detect-every", type=int, default=5)
+    parser.add_argument("--motion-threshold", type=float, default=None)
+    args = parser.parse_args()
+
+    model = YOLO(args.weights)
+    clips = sorted(p for p in args.video_dir.glob("*") if p.suffix.lower() in VIDEO_EXTENSIONS)
+
+    print("mAP is measured against frame-by-frame detections of the same model")
+    print(f"{'clip':<12} {'full FPS':>9} {'skip FPS':>9} {'speedup':>8} {'detected':>9} {'mAP50':>7} {'mAP50-95':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for clip in clips:
+            reference_report, tracked_report, metrics = benchmark_clip(model, clip, Path(tmp), args)
+            speedup = tracked_report['fps'] / max(reference_report['fps'], 1e-9)
+            detected = f"{tracked_report['detected_frames']}/{tracked_report['frames']}"
+            print(f"{clip.name:<12} {reference_report['fps']:>9.1f} {tracked_report['fps']:>9.1f} {speedup:>7.2f}x "
+                  f"{detected:>9} {metrics['map50']:>7.3f} {metrics['map50_95']:>9.3f}")
@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import statistics
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT / "src"))
+sys.path.append(str(PROJECT_ROOT / "benchmarks"))
+
+from synthetic_data import CLASS_NAMES, make_videos, make_labelled_images, make_label_files
+
+RESULTS_DIR = PROJECT_ROOT / "benchmarks/results"
+CASES = ['extract', 'split', 'labels', 'inference']
+
+def metric(value: float, unit: str, higher_is_better: bool = True):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+def best_of(repeat: int, run):
+    return min(run() for _ in range(repeat))
+
+def bench_extract(work_dir: Path, repeat: int, workers: int):
+    from data_preparation.extract_frames import extract_frames_from_videos
+
+    videos = make_videos(work_dir / "videos", count=2, frames=300)
+    total_frames = 600
+
+    def run():
+        output_dir = work_dir / f"frames_{time.perf_counter_ns()}"
+        started = time.perf_counter()
+        extract_frames_from_videos(work_dir / "videos", output_dir, frame_stride=10, workers=workers, use_manifest=False)
+        return time.perf_counter() - started
+
+    seconds = best_of(repeat, run)
+    return {'frames_per_s': metric(total_frames / seconds, 'frames/s'), 'seconds': metric(seconds, 's', False),
+            'videos': metric(len(videos), 'count')}
+
+def bench_split(work_dir: Path, repeat: int, workers: int):
+    from data_preparation.split_dataset import split_annotated_dataset
+
+    count = 500
+    make_labelled_images(work_dir / "images", work_dir / "labels", count=count, videos=25)
+    results = {}
+    for mode in ('link', 'copy'):
+        def run():
+            output_dir = work_dir / f"split_{mode}_{time.perf_counter_ns()}"
+            started = time.perf_counter()
+            split_annotated_dataset(work_dir / "images", work_dir / "labels", output_dir, mode=mode, workers=workers,
+                                    class_names=CLASS_NAMES)
+            return time.perf_counter() - started
+
+        seconds = best_of(repeat, run)
+        results[f"{mode}_files_per_s"] = metric(count / seconds, 'files/s')
+    return results
+
+def bench_labels(work_dir: Path, repeat: int, workers: int):
+    from evaluation.metrics import read_yolo_boxes
+    from common.yolo_labels import read_label_file, load_label_dir, write_label_files, LABEL_CACHE_NAME
+
+    count = 5000
+    label_dir = work_dir / "label_files"
+    make_label_files(label_dir, count=count)
+    label_files = sorted(label_dir.glob("*.txt"))
+
+    def parse_counts():
+        started = time.perf_counter()
+        for label_path in label_files:
+            rows, _ = read_label_file(label_path, len(CLASS_NAMES))
+            np.bincount(rows[:, 0].astype(np.int64), minlength=len(CLASS_NAMES))
+        return time.perf_counter() - started
+
+    def parse_boxes():
+        started = time.perf_counter()
+        for label_path in label_files:
+            read_yolo_boxes(label_path, 1920, 1080)
+        return time.perf_counter() - started
+
+    def bulk_load(cached: bool):
+        def run():
+            if not cached:
+                (label_dir / LABEL_CACHE_NAME).unlink(missing_ok=True)
+            started = time.perf_counter()
+            load_label_dir(label_dir, len(CLASS_NAMES), workers=workers).class_counts(len(CLASS_NAMES))
+            return time.perf_counter() - started
+        return run
+
+    rows = np.array([(0, 0.5, 0.5, 0.1, 0.1)] * 6, dtype=np.float32)
+    save_dir = work_dir / "saved_labels"
+
+    def save():
+        started = time.perf_counter()
+        write_label_files(save_dir, {f"label_{i:05d}": rows for i in range(count)}, workers=workers)
+        return time.perf_counter() - started
+
+    return {
+        'class_counts_files_per_s': metric(count / best_of(repeat, parse_counts), 'files/s'),
+        'boxes_files_per_s': metric(count / best_of(repeat, parse_boxes), 'files/s'),
+        'bulk_cold_files_per_s': metric(count / best_of(repeat, bulk_load(False)), 'files/s'),
+        'bulk_cached_files_per_s': metric(count / best_of(repeat, bulk_load(True)), 'files/s'),
+        'save_files_per_s': metric(count / best_of(repeat, save), 'files/s')
+    }
+
+def bench_inference(work_dir: Path, repeat: int, workers: int):
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        print("ultralytics is not installed, skipping inference")
+        return {}
+
+    model = YOLO("yolo11n.yaml")
+    image = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    results = {}
+    for imgsz in (320, 640):
+        model.predict(image, imgsz=imgsz, device='cpu', verbose=False)
+        timings = []
+        for _ in range(10 * repeat):
+            started = time.perf_counter()
+            model.predict(image, imgsz=imgsz, device='cpu', verbose=False)
+            timings.append((time.perf_counter() - started) * 1000)
+        results[f"latency_ms_p50_{imgsz}"] = metric(statistics.median(timings), 'ms', False)
+    return results
+
+BENCHMARKS = {
+    'extract': bench_extract,
+    'split': bench_split,
+    'labels': bench_labels,
+    'inference': bench_inference
+}
+
+def package_version(name: str):
+    try:
+        module = __import__(name)
+    except ImportError:
+        return None
+    return getattr(module, '__version__', None)
+
+def machine_metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=PROJECT_ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': package_version('numpy'),
+        'opencv': package_version('cv2'),
+        'torch': package_version('torch'),
+        'ultralytics': package_version('ultralytics'),
+        'git_commit': commit or None
+    }
+
+def run_benchmarks(cases, repeat: int = 3, workers: int = 4, output: Path = None):
+    report = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'machine': machine_metadata(), 'results': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for case in cases:
+            work_dir = Path(tmp) / case
+            work_dir.mkdir()
+            started = time.perf_counter()
+            report['results'][case] = BENCHMARKS[case](work_dir, repeat, workers)
+            print(f"{case}: done in {time.perf_counter() - started:.1f} s")
+            for name, result in report['results'][case].items():
+                print(f"    {name:<28} {result['value']:>12.2f} {result['unit']}")
+
+    output = output or RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+    return report
+
+def compare_results(baseline_path: Path, current_path: Path, threshold: float = 0.1):
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    with open(current_path, 'r') as f:
+        current = json.load(f)
+
+    for key in ('processor', 'cpu_count', 'platform'):
+        if baseline['machine'].get(key) != current['machine'].get(key):
+            print(f"warning: {key} differs ({baseline['machine'].get(key)} vs {current['machine'].get(key)})")
+
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for case, metrics in current['results'].items():
+        for name, result in metrics.items():
+            old = baseline['results'].get(case, {}).get(name)
+            if old is None or old['value'] == 0 or result['unit'] == 'count':
+                continue
+            change = result['value'] / old['value'] - 1
+            worse = -change if result['higher_is_better'] else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            print(f"{case + '.' + name:<40} {old['value']:>12.2f} {result['value']:>12.2f} {change:>+7.1%}{flag}")
+            if flag:
+                regressions.append(f"{case}.{name}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regressions beyond {threshold:.0%}: {', '.join(regressions)}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--workers", type=int, default=4)
+    run_parser.add_argument("--output", type=Path, default=None)
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run_benchmarks(args.cases, args.repeat, args.workers, args.output)
+    else:
+        sys.exit(1 if compare_results(args.baseline, args.current, args.threshold) else 0)
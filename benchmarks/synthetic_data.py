@@ -0,0 +1,57 @@
+import cv2
+import random
+import numpy as np
+from pathlib import Path
+
+CLASS_NAMES = ['full_plate', 'empty_plate', 'cutlery', 'glass']
+
+def random_scene(rng: random.Random, width: int, height: int, boxes: int):
+    image = np.full((height, width, 3), rng.randint(40, 90), dtype=np.uint8)
+    labels = []
+    for _ in range(boxes):
+        w, h = rng.randint(width // 20, width // 4), rng.randint(height // 20, height // 4)
+        x, y = rng.randint(0, width - w), rng.randint(0, height - h)
+        color = tuple(rng.randint(100, 255) for _ in range(3))
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, -1)
+        labels.append((rng.randrange(len(CLASS_NAMES)), (x + w / 2) / width, (y + h / 2) / height, w / width, h / height))
+    return image, labels
+
+def make_videos(video_dir: Path, count: int = 2, frames: int = 300, width: int = 1280, height: int = 720, seed: int = 0):
+    video_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    for v in range(count):
+        writer = cv2.VideoWriter(str(video_dir / f"synthetic_{v}.mov"), cv2.VideoWriter_fourcc(*'mp4v'), 30,
+                                 (width, height))
+        background, _ = random_scene(rng, width, height, 6)
+        for i in range(frames):
+            frame = np.roll(background, i * 4, axis=1)
+            cv2.putText(frame, str(i), (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+            writer.write(frame)
+        writer.release()
+    return sorted(video_dir.glob("*.mov"))
+
+def write_labels(label_path: Path, labels):
+    with open(label_path, 'w') as f:
+        for class_id, x, y, w, h in labels:
+            f.write(f"{class_id} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n")
+
+def make_labelled_images(image_dir: Path, label_dir: Path, count: int = 200, videos: int = 10, width: int = 640,
+                         height: int = 360, seed: int = 0):
+    image_dir.mkdir(parents=True, exist_ok=True)
+    label_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    for i in range(count):
+        stem = f"synthetic_{i % videos}_frame_{i:05d}"
+        image, labels = random_scene(rng, width, height, rng.randint(1, 8))
+        cv2.imwrite(str(image_dir / f"{stem}.jpg"), image)
+        write_labels(label_dir / f"{stem}.txt", labels)
+
+def make_label_files(label_dir: Path, count: int = 5000, seed: int = 0):
+    label_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    for i in range(count):
+        labels = []
+        for _ in range(rng.randint(0, 12)):
+            w, h = rng.uniform(0.01, 0.25), rng.uniform(0.01, 0.25)
+            labels.append((rng.randrange(len(CLASS_NAMES)), rng.uniform(w / 2, 1 - w / 2), rng.uniform(h / 2, 1 - h / 2), w, h))
+        write_labels(label_dir / f"synthetic_{i % 50}_frame_{i:05d}.txt", labels)
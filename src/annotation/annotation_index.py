@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import numpy as np
+import threading
+from pathlib import Path
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from common.yolo_labels import parse_label_texts
+
+INDEX_NAME = ".annotation_index.sqlite"
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
+
+def list_images(image_dir: Path):
+    with os.scandir(image_dir) as entries:
+        names = [e.name for e in entries if os.path.splitext(e.name)[1].lower() in IMAGE_EXTENSIONS and e.is_file()]
+    return [image_dir / name for name in sorted(names)]
+
+def label_mtimes(label_dir: Path):
+    with os.scandir(label_dir) as entries:
+        return {e.name[:-4]: e.stat().st_mtime for e in entries if e.name.endswith('.txt') and not e.name.startswith('.')}
+
+class AnnotationIndex(QObject):
+    scanned = pyqtSignal()
+
+    def __init__(self, label_dir: Path, num_classes: int, parent=None):
+        super().__init__(parent)
+        self.label_dir = label_dir
+        self.num_classes = num_classes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(label_dir / INDEX_NAME), check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS images (
+                stem TEXT PRIMARY KEY,
+                label_mtime REAL,
+                status TEXT NOT NULL,
+                box_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS image_classes (
+                stem TEXT NOT NULL,
+                class_id INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (stem, class_id)
+            );
+            CREATE INDEX IF NOT EXISTS image_classes_by_class ON image_classes (class_id);
+            CREATE INDEX IF NOT EXISTS images_by_status ON images (status);
+        """)
+        self.conn.commit()
+        self.thread = None
+        self.stopped = False
+
+    def close(self):
+        self.stopped = True
+        if self.thread is not None:
+            self.thread.join()
+        with self.lock:
+            self.conn.close()
+
+    def start_scan(self, image_files):
+        stems = [p.stem for p in image_files]
+        self.thread = threading.Thread(target=self._scan, args=(stems,), daemon=True)
+        self.thread.start()
+
+    def _scan(self, stems, batch_size=1000):
+        mtimes = label_mtimes(self.label_dir)
+        with self.lock:
+            known = dict(self.conn.execute("SELECT stem, label_mtime FROM images"))
+        stale = set(known) - set(stems)
+
+        changed = [stem for stem in stems if stem not in known or known[stem] != mtimes.get(stem)]
+        for start in range(0, len(changed), batch_size):
+            if self.stopped:
+                return
+            batch = changed[start:start + batch_size]
+            labeled = [stem for stem in batch if mtimes.get(stem) is not None]
+            texts = []
+            for stem in labeled:
+                with open(self.label_dir / f"{stem}.txt", 'r') as f:
+                    texts.append(f.read())
+            counts = {stem: np.bincount(rows[:, 0].astype(np.int64), minlength=self.num_classes).tolist()
+                      for stem, (rows, _) in zip(labeled, parse_label_texts(texts, self.num_classes))}
+            self._write([(stem, counts.get(stem), mtimes.get(stem)) for stem in batch])
+
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM images WHERE stem = ?", [(s,) for s in stale])
+            self.conn.executemany("DELETE FROM image_classes WHERE stem = ?", [(s,) for s in stale])
+        self.scanned.emit()
+
+    def _write(self, updates):
+        if not updates:
+            return
+        with self.lock, self.conn:
+            for stem, counts, mtime in updates:
+                self._upsert(stem, counts, mtime)
+
+    def _upsert(self, stem, counts, mtime):
+        if counts is None:
+            status, box_count = 'unlabeled', 0
+        else:
+            box_count = sum(counts)
+            status = 'labeled' if box_count else 'empty'
+        self.conn.execute(
+            "INSERT OR REPLACE INTO images (stem, label_mtime, status, box_count) VALUES (?, ?, ?, ?)",
+            (stem, mtime, status, box_count)
+        )
+        self.conn.execute("DELETE FROM image_classes WHERE stem = ?", (stem,))
+        self.conn.executemany(
+            "INSERT INTO image_classes (stem, class_id, count) VALUES (?, ?, ?)",
+            [(stem, class_id, count) for class_id, count in enumerate(counts or []) if count]
+        )
+
+    def record(self, stem: str, class_ids):
+        counts = [0] * self.num_classes
+        for class_id in class_ids:
+            counts[class_id] += 1
+        with self.lock, self.conn:
+            self._upsert(stem, counts, None)
+
+    def stems_with_status(self, status: str):
+        with self.lock:
+            return {stem for (stem,) in self.conn.execute("SELECT stem FROM images WHERE status = ?", (status,))}
+
+    def stems_with_class(self, class_id: int):
+        with self.lock:
+            return {stem for (stem,) in self.conn.execute(
+                "SELECT stem FROM image_classes WHERE class_id = ?", (class_id,))}
+
+    def stems_with_at_most(self, max_boxes: int):
+        with self.lock:
+            return {stem for (stem,) in self.conn.execute(
+                "SELECT stem FROM images WHERE status != 'unlabeled' AND box_count <= ?", (max_boxes,))}
+
+    def progress(self):
+        with self.lock:
+            rows = dict(self.conn.execute("SELECT status, COUNT(*) FROM images GROUP BY status"))
+        return rows.get('labeled', 0) + rows.get('empty', 0), sum(rows.values())
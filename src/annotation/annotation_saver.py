@@ -0,0 +1,75 @@
+import os
+import queue
+import threading
+from pathlib import Path
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from common.instrumentation import traced
+
+@traced('annotator.write_labels')
+def write_atomic(path: Path, text: str):
+    temporary = path.with_name(f".{path.name}.tmp")
+    with open(temporary, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+class AnnotationSaver(QObject):
+    saved = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pending = {}
+        self.queued = set()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, path: Path, text: str):
+        key = str(path)
+        with self.lock:
+            self.pending[key] = text
+            if key in self.queued:
+                return
+            self.queued.add(key)
+        self.queue.put(key)
+
+    def pending_text(self, path: Path):
+        with self.lock:
+            return self.pending.get(str(path))
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        if not self.thread.is_alive():
+            return
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            key = self.queue.get()
+            if key is None:
+                self.queue.task_done()
+                return
+
+            with self.lock:
+                self.queued.discard(key)
+                text = self.pending.get(key)
+            try:
+                if text is not None:
+                    write_atomic(Path(key), text)
+            except Exception as e:
+                self.failed.emit(key, str(e))
+            else:
+                with self.lock:
+                    if self.pending.get(key) is text:
+                        del self.pending[key]
+                self.saved.emit(key)
+            finally:
+                self.queue.task_done()
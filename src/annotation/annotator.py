@@ -1,12 +1,25 @@
 import sys
+import argparse
+from collections import OrderedDict
 from pathlib import Path
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QLabel, QVBoxLayout,
                              QWidget, QListWidget, QPushButton, QHBoxLayout,
                              QFileDialog, QListWidgetItem, QMessageBox,
                              QAbstractItemView, QFrame, QStyle, QAction)
 from PyQt5.QtGui import (QPixmap, QPainter, QPen, QColor, QFont,
-                         QKeySequence)
-from PyQt5.QtCore import (Qt, QPoint, QRect, QSize, QPointF)
+                         QFontMetrics, QKeySequence)
+from PyQt5.QtCore import (Qt, QPoint, QRect, QSize, QPointF, QRectF, QSizeF)
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from annotation.image_cache import ImageCache
+from annotation.annotation_saver import AnnotationSaver
+from annotation.prelabeler import Prelabeler
+from annotation.annotation_index import AnnotationIndex, list_images
+from common.instrumentation import traced, install
+from common.yolo_labels import load_class_names, parse_labels, format_labels, to_xywhn
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
 
 DARK_STYLESHEET = """
 QWidget { background-color: #2b2b2b; color: #f0f0f0; font-size: 14px; }
@@ -35,9 +48,19 @@ class ZoomPanLabel(QLabel):
         self.end_point = QPoint()
         self.drawing = False
         self.setMouseTracking(True)
+        self.box_pen = QPen(QColor(82, 139, 255), 2, Qt.SolidLine)
+        self.box_pen.setCosmetic(True)
+        self.predicted_pen = QPen(QColor(255, 184, 77), 2, Qt.DashLine)
+        self.predicted_pen.setCosmetic(True)
+        self.label_font = QFont('Arial', 12, QFont.Bold)
+        self.label_metrics = QFontMetrics(self.label_font)
+        self.label_widths = {}
+        self.scaled_cache = OrderedDict()
+        self.scaled_cache_size = 4
 
     def setPixmap(self, pixmap):
         self._pixmap = pixmap
+        self.scaled_cache.clear()
         self.reset_zoom()
         self.update()
 
@@ -60,6 +83,33 @@ class ZoomPanLabel(QLabel):
     def image_to_screen_coords(self, image_pos):
         return image_pos * self.scale + self.offset
 
+    def image_rect_to_screen(self, rect):
+        top_left_screen = self.image_to_screen_coords(QPointF(rect.topLeft()))
+        bottom_right_screen = self.image_to_screen_coords(QPointF(rect.bottomRight()))
+        return QRect(top_left_screen.toPoint(), bottom_right_screen.toPoint())
+
+    def drawing_rect(self):
+        return self.image_rect_to_screen(QRect(self.start_point, self.end_point)).normalized()
+
+    def scaled_pixmap(self):
+        key = round(self.scale, 6)
+        scaled = self.scaled_cache.get(key)
+        if scaled is None:
+            scaled = self._pixmap.scaled(self._pixmap.size() * self.scale, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            self.scaled_cache[key] = scaled
+            while len(self.scaled_cache) > self.scaled_cache_size:
+                self.scaled_cache.popitem(last=False)
+        else:
+            self.scaled_cache.move_to_end(key)
+        return scaled
+
+    def label_width(self, label):
+        width = self.label_widths.get(label)
+        if width is None:
+            width = self.label_metrics.horizontalAdvance(label)
+            self.label_widths[label] = width
+        return width
+
     def wheelEvent(self, event):
         zoom_factor = 1.15
         old_scale = self.scale
@@ -88,13 +138,15 @@ class ZoomPanLabel(QLabel):
             self.pan_last_pos = event.pos()
             self.update()
         elif self.drawing:
+            old_rect = self.drawing_rect()
             self.end_point = self.screen_to_image_coords(event.pos()).toPoint()
-            self.update()
+            self.update(old_rect.united(self.drawing_rect()).adjusted(-3, -3, 3, 3))
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MiddleButton:
             self.is_panning = False
             self.setCursor(Qt.ArrowCursor)
+            self.update()
         elif event.button() == Qt.LeftButton and self.drawing:
             self.drawing = False
             self.parent_window.add_new_box(QRect(self.start_point, self.end_point).normalized())
@@ -103,29 +155,37 @@ class ZoomPanLabel(QLabel):
     def paintEvent(self, event):
         if self._pixmap.isNull(): return
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform)
-        target_rect = QRect(self.offset.toPoint(), (self._pixmap.size() * self.scale))
-        painter.drawPixmap(target_rect, self._pixmap)
-        pen_rect = QPen(QColor(82, 139, 255), 2, Qt.SolidLine)
-        pen_rect.setCosmetic(True)
-        painter.setPen(pen_rect)
+        dirty_rect = event.rect()
+        target_rect = QRectF(self.offset, QSizeF(self._pixmap.size()) * self.scale)
+        visible_rect = target_rect.intersected(QRectF(dirty_rect))
+        if not visible_rect.isEmpty():
+            if self.scale < 1:
+                painter.drawPixmap(visible_rect, self.scaled_pixmap(), visible_rect.translated(-self.offset))
+            else:
+                if not (self.is_panning or self.drawing):
+                    painter.setRenderHint(QPainter.SmoothPixmapTransform)
+                source_rect = QRectF((visible_rect.topLeft() - self.offset) / self.scale,
+                                     visible_rect.size() / self.scale)
+                painter.drawPixmap(visible_rect, self._pixmap, source_rect)
+
+        painter.setFont(self.label_font)
+        text_height = self.label_metrics.height()
         for box in self.parent_window.boxes:
-            box_rect_img = box['rect']
-            top_left_screen = self.image_to_screen_coords(QPointF(box_rect_img.topLeft()))
-            bottom_right_screen = self.image_to_screen_coords(QPointF(box_rect_img.bottomRight()))
-            screen_rect = QRect(top_left_screen.toPoint(), bottom_right_screen.toPoint())
+            screen_rect = self.image_rect_to_screen(box['rect'])
+            label_rect = screen_rect.adjusted(-2, -text_height - 5, self.label_width(box['label']), 2)
+            if not label_rect.intersects(dirty_rect):
+                continue
+            painter.setPen(self.predicted_pen if box.get('predicted') else self.box_pen)
             painter.drawRect(screen_rect)
-            painter.setFont(QFont('Arial', 12, QFont.Bold))
             painter.drawText(screen_rect.topLeft() - QPoint(0, 5), box['label'])
         if self.drawing:
-            top_left_screen = self.image_to_screen_coords(QPointF(self.start_point))
-            bottom_right_screen = self.image_to_screen_coords(QPointF(self.end_point))
-            painter.drawRect(QRect(top_left_screen.toPoint(), bottom_right_screen.toPoint()))
+            painter.setPen(self.box_pen)
+            painter.drawRect(self.image_rect_to_screen(QRect(self.start_point, self.end_point)))
 
     def resizeEvent(self, event): self.reset_zoom()
 
 class AnnotationWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, prefetch=4, cache_mb=512, downscale=False, weights=None, prelabel=False, prelabel_conf=0.4):
         super().__init__()
         self.setWindowTitle("Dark Annotator")
         self.setGeometry(100, 100, 1400, 900)
@@ -134,11 +194,29 @@ class AnnotationWindow(QMainWindow):
         self.image_files = []
         self.current_image_index = -1
         self.classes = []
+        self.class_ids = {}
         self.boxes = []
+        self.dirty = False
         self.create_mode = False
+        self.prefetch = prefetch
+        max_size = None
+        if downscale:
+            screen = QApplication.primaryScreen()
+            max_size = screen.availableGeometry().size() * screen.devicePixelRatio()
+        self.image_cache = ImageCache(max_bytes=cache_mb * 1024 * 1024, max_size=max_size, parent=self)
+        self.saver = AnnotationSaver(self)
+        self.saver.failed.connect(self.on_save_failed)
+        self.index = None
         self.setup_ui()
         self.setup_actions()
         self.load_classes()
+        self.prelabel_enabled = False
+        self.prelabeler = None
+        if weights is not None:
+            self.prelabeler = Prelabeler(weights, self.classes, conf=prelabel_conf, parent=self)
+            self.prelabeler.predicted.connect(self.on_prediction_ready)
+            self.prelabeler.failed.connect(self.on_prediction_failed)
+            self.prelabel_enabled = prelabel
 
     def setup_ui(self):
         self.central_widget = QWidget()
@@ -181,7 +259,13 @@ class AnnotationWindow(QMainWindow):
             QAction(self, text="Previous Image", shortcut="A", triggered=self.prev_image),
             QAction(self, text="Load Directory", shortcut="O", triggered=self.load_directory),
             QAction(self, text="Undo Box", shortcut=QKeySequence.Undo, triggered=self.undo_last_box),
-            QAction(self, text="Create Box Mode", shortcut="W", triggered=self.toggle_create_mode)
+            QAction(self, text="Create Box Mode", shortcut="W", triggered=self.toggle_create_mode),
+            QAction(self, text="Toggle Pre-labelling", shortcut="P", triggered=self.toggle_prelabel),
+            QAction(self, text="Accept Predictions", shortcut="F", triggered=self.accept_predictions),
+            QAction(self, text="Reject Predictions", shortcut="R", triggered=self.reject_predictions),
+            QAction(self, text="Next Unlabeled Image", shortcut="U", triggered=self.next_unlabeled),
+            QAction(self, text="Next Image With Selected Class", shortcut="C", triggered=self.next_with_selected_class),
+            QAction(self, text="Next Sparse Image", shortcut="S", triggered=self.next_sparse)
         ]
         self.addActions(self.actions_list)
 
@@ -192,34 +276,139 @@ class AnnotationWindow(QMainWindow):
     def is_create_mode_enabled(self): return self.create_mode
 
     def load_classes(self):
-        project_root = Path(__file__).resolve().parents[2]
-        classes_file = project_root / "classes.txt"
+        classes_file = PROJECT_ROOT / "classes.txt"
         if classes_file.exists():
-            with open(classes_file, 'r') as f:
-                self.classes = [line.strip() for line in f if line.strip()]
+            self.classes = load_class_names(classes_file)
+            self.class_ids = {name: i for i, name in enumerate(self.classes)}
             self.class_list_widget.addItems(self.classes)
             if self.classes: self.class_list_widget.setCurrentRow(0)
 
     def load_directory(self):
         dir_path = QFileDialog.getExistingDirectory(self, "Select Image Directory")
         if not dir_path: return
-        
+        self.open_directory(Path(dir_path))
+
+    def open_directory(self, dir_path):
+        if self.image_dir:
+            self.save_annotations()
         self.image_dir = Path(dir_path)
         self.label_dir = self.image_dir.parent / f"{self.image_dir.name}_labels"
         self.label_dir.mkdir(parents=True, exist_ok=True)
         
-        self.image_files = sorted([f for f in self.image_dir.glob("*.jpg")])
+        self.image_files = list_images(self.image_dir)
+        self.image_cache.clear()
+        if self.index is not None:
+            self.index.close()
+        self.index = AnnotationIndex(self.label_dir, len(self.classes), self)
+        self.index.scanned.connect(self.update_progress)
+        self.index.start_scan(self.image_files)
         if self.image_files:
             self.current_image_index = 0
+            if self.prelabel_enabled:
+                self.prelabeler.start(self.image_files, 0)
             self.load_current_image()
 
+    @traced('annotator.show_image')
     def load_current_image(self):
         if 0 <= self.current_image_index < len(self.image_files):
             filepath = self.image_files[self.current_image_index]
-            pixmap = QPixmap(str(filepath))
-            self.image_label.setPixmap(pixmap)
+            image = self.image_cache.load(str(filepath))
+            self.image_label.setPixmap(QPixmap.fromImage(image))
             self.load_annotations()
             self.update_box_list()
+            self.prefetch_neighbours()
+            if self.prelabel_enabled:
+                self.prelabeler.set_cursor(self.current_image_index)
+                self.apply_predictions()
+
+    def toggle_prelabel(self):
+        if self.prelabeler is None:
+            QMessageBox.warning(self, "No Model", "Start the annotator with --weights to enable pre-labelling.")
+            return
+        self.prelabel_enabled = not self.prelabel_enabled
+        if self.prelabel_enabled:
+            if self.image_files:
+                self.prelabeler.start(self.image_files, max(self.current_image_index, 0))
+                self.apply_predictions()
+            self.statusBar().showMessage("Pre-labelling enabled")
+        else:
+            self.prelabeler.stop()
+            self.statusBar().showMessage("Pre-labelling disabled")
+
+    def apply_predictions(self):
+        if not self.prelabel_enabled or self.current_image_index == -1 or self.boxes: return
+        current_image_path = self.image_files[self.current_image_index]
+        label_path = self.label_dir / f"{current_image_path.stem}.txt"
+        if label_path.exists() or self.saver.pending_text(label_path) is not None: return
+        predictions = self.prelabeler.get(current_image_path)
+        pixmap = self.image_label.pixmap()
+        if not predictions or pixmap.isNull(): return
+        img_w, img_h = pixmap.width(), pixmap.height()
+        for label, x1, y1, x2, y2 in predictions:
+            rect = QRect(int(x1 * img_w), int(y1 * img_h), int((x2 - x1) * img_w), int((y2 - y1) * img_h))
+            self.boxes.append({'rect': rect, 'label': label, 'predicted': True})
+        self.update_box_list()
+
+    def on_prediction_ready(self, path):
+        if self.current_image_index != -1 and str(self.image_files[self.current_image_index]) == path:
+            self.apply_predictions()
+
+    def on_prediction_failed(self, error):
+        self.prelabel_enabled = False
+        QMessageBox.warning(self, "Pre-labelling Failed", error)
+
+    def accept_predictions(self):
+        for box in self.boxes:
+            if box.get('predicted'):
+                box['predicted'] = False
+                self.dirty = True
+        self.update_box_list()
+
+    def reject_predictions(self):
+        kept = [box for box in self.boxes if not box.get('predicted')]
+        if len(kept) != len(self.boxes):
+            self.boxes = kept
+            self.dirty = True
+            self.update_box_list()
+
+    def prefetch_neighbours(self):
+        paths = []
+        for step in range(1, self.prefetch + 1):
+            for index in (self.current_image_index + step, self.current_image_index - step):
+                if 0 <= index < len(self.image_files):
+                    paths.append(str(self.image_files[index]))
+        self.image_cache.prefetch(paths)
+
+    def jump_to_matching(self, stems, description):
+        if not self.image_files: return
+        count = len(self.image_files)
+        for step in range(1, count):
+            index = (self.current_image_index + step) % count
+            if self.image_files[index].stem in stems:
+                self.save_annotations()
+                self.current_image_index = index
+                self.load_current_image()
+                return
+        self.statusBar().showMessage(f"No {description} images found")
+
+    def next_unlabeled(self):
+        if self.index is not None:
+            self.jump_to_matching(self.index.stems_with_status('unlabeled'), "unlabeled")
+
+    def next_with_selected_class(self):
+        selected_items = self.class_list_widget.selectedItems()
+        if self.index is not None and selected_items:
+            label = selected_items[0].text()
+            self.jump_to_matching(self.index.stems_with_class(self.class_ids[label]), f"'{label}'")
+
+    def next_sparse(self, max_boxes=1):
+        if self.index is not None:
+            self.jump_to_matching(self.index.stems_with_at_most(max_boxes), "sparse")
+
+    def update_progress(self):
+        if self.index is None: return
+        labeled, _ = self.index.progress()
+        self.statusBar().showMessage(f"{labeled} / {len(self.image_files)} images labeled")
 
     def next_image(self):
         if self.image_dir and self.current_image_index < len(self.image_files) - 1:
@@ -240,6 +429,7 @@ class AnnotationWindow(QMainWindow):
         else:
             label = selected_items[0].text()
             self.boxes.append({'rect': rect, 'label': label})
+            self.dirty = True
             self.update_box_list()
         self.create_mode = False
         self.image_label.setCursor(Qt.ArrowCursor)
@@ -247,60 +437,90 @@ class AnnotationWindow(QMainWindow):
     def undo_last_box(self):
         if self.boxes:
             self.boxes.pop()
+            self.dirty = True
             self.update_box_list()
 
     def update_box_list(self):
         self.box_list_widget.clear()
         for box in self.boxes:
-            self.box_list_widget.addItem(f"{box['label']} @ ({box['rect'].x()},{box['rect'].y()})")
+            suffix = " (auto)" if box.get('predicted') else ""
+            self.box_list_widget.addItem(f"{box['label']} @ ({box['rect'].x()},{box['rect'].y()}){suffix}")
         self.image_label.update()
 
     def save_annotations(self):
         if self.current_image_index == -1: return
         current_image_path = self.image_files[self.current_image_index]
         label_path = self.label_dir / f"{current_image_path.stem}.txt"
+        unreviewed = any(box.get('predicted') for box in self.boxes)
+        if not self.dirty and (unreviewed or label_path.exists() or self.saver.pending_text(label_path) is not None): return
         pixmap = self.image_label.pixmap()
         if pixmap.isNull(): return
         img_w, img_h = pixmap.width(), pixmap.height()
         if img_w == 0 or img_h == 0: return
 
-        try:
-            with open(label_path, 'w') as f:
-                for box in self.boxes:
-                    class_id = self.classes.index(box['label'])
-                    rect = box['rect']
-                    x_c = (rect.x() + rect.width() / 2) / img_w
-                    y_c = (rect.y() + rect.height() / 2) / img_h
-                    w = rect.width() / img_w
-                    h = rect.height() / img_h
-                    f.write(f"{class_id} {x_c:.6f} {y_c:.6f} {w:.6f} {h:.6f}\n")
-        except Exception:
-            pass
+        boxes = [box for box in self.boxes if not box.get('predicted')]
+        class_ids = [self.class_ids[box['label']] for box in boxes]
+        corners = [(r.x(), r.y(), r.x() + r.width(), r.y() + r.height()) for r in (box['rect'] for box in boxes)]
+        self.saver.submit(label_path, format_labels(to_xywhn(class_ids, corners, img_w, img_h)))
+        self.dirty = False
+        if self.index is not None:
+            self.index.record(current_image_path.stem, class_ids)
+            self.update_progress()
+
+    def on_save_failed(self, path, error):
+        QMessageBox.critical(self, "Save Failed", f"Could not save annotations to {path}:\n{error}")
+
+    def closeEvent(self, event):
+        self.save_annotations()
+        if self.prelabeler is not None:
+            self.prelabeler.stop()
+        self.saver.close()
+        if self.index is not None:
+            self.index.close()
+        if self.saver.pending:
+            QMessageBox.critical(self, "Save Failed", "Annotations could not be saved:\n" + "\n".join(self.saver.pending))
+        self.image_cache.clear()
+        super().closeEvent(event)
 
     def load_annotations(self):
         self.boxes = []
+        self.dirty = False
         if self.current_image_index == -1: return
         current_image_path = self.image_files[self.current_image_index]
         label_path = self.label_dir / f"{current_image_path.stem}.txt"
-        if not label_path.exists(): return
+        text = self.saver.pending_text(label_path)
+        if text is None:
+            if not label_path.exists(): return
+            with open(label_path, 'r') as f:
+                text = f.read()
         pixmap = self.image_label.pixmap()
         if pixmap.isNull(): return
         img_w, img_h = pixmap.width(), pixmap.height()
-        with open(label_path, 'r') as f:
-            for line in f:
-                try:
-                    parts = line.strip().split()
-                    if len(parts) != 5: continue
-                    class_id, x_c, y_c, w, h = [float(p) for p in parts]
-                    label = self.classes[int(class_id)]
-                    box_w, box_h = w * img_w, h * img_h
-                    box_x, box_y = x_c * img_w - box_w / 2, y_c * img_h - box_h / 2
-                    self.boxes.append({'rect': QRect(int(box_x), int(box_y), int(box_w), int(box_h)), 'label': label})
-                except Exception: continue
+        rows, issues = parse_labels(text, len(self.classes))
+        for class_id, x_c, y_c, w, h in rows.tolist():
+            box_w, box_h = w * img_w, h * img_h
+            box_x, box_y = x_c * img_w - box_w / 2, y_c * img_h - box_h / 2
+            self.boxes.append({'rect': QRect(int(box_x), int(box_y), int(box_w), int(box_h)),
+                               'label': self.classes[int(class_id)]})
+        if issues:
+            self.statusBar().showMessage(f"{label_path.name}: " + "; ".join(f"line {n}: {m}" for n, m in issues[:3]))
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    install('annotator')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prefetch", type=int, default=4)
+    parser.add_argument("--cache-mb", type=int, default=512)
+    parser.add_argument("--downscale", action="store_true")
+    parser.add_argument("--weights", type=Path, default=PROJECT_ROOT / "runs/detect/yolov11m_food_exp_hpo/weights/best.pt")
+    parser.add_argument("--prelabel", action="store_true")
+    parser.add_argument("--prelabel-conf", type=float, default=0.4)
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyleSheet(DARK_STYLESHEET)
-    window = AnnotationWindow()
+    window = AnnotationWindow(prefetch=args.prefetch, cache_mb=args.cache_mb, downscale=args.downscale,
+                              weights=args.weights if args.weights.exists() else None,
+                              prelabel=args.prelabel, prelabel_conf=args.prelabel_conf)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from PyQt5.QtGui import QImage, QImageReader
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QSize, Qt, pyqtSignal
+
+from common.instrumentation import traced, count
+
+@traced('annotator.decode_image')
+def read_image(path: str, max_size: QSize = None) -> QImage:
+    reader = QImageReader(path)
+    if max_size is not None:
+        size = reader.size()
+        if size.isValid() and (size.width() > max_size.width() or size.height() > max_size.height()):
+            reader.setScaledSize(size.scaled(max_size, Qt.KeepAspectRatio))
+    return reader.read()
+
+class _LoaderSignals(QObject):
+    loaded = pyqtSignal(str, QImage)
+
+class _LoadTask(QRunnable):
+    def __init__(self, path, max_size, signals):
+        super().__init__()
+        self.path = path
+        self.max_size = max_size
+        self.signals = signals
+
+    def run(self):
+        self.signals.loaded.emit(self.path, read_image(self.path, self.max_size))
+
+class ImageCache(QObject):
+    def __init__(self, max_bytes=512 * 1024 * 1024, max_size=None, threads=2, parent=None):
+        super().__init__(parent)
+        self.max_bytes = max_bytes
+        self.max_size = max_size
+        self.images = OrderedDict()
+        self.total_bytes = 0
+        self.pending = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(threads, 1))
+        self.signals = _LoaderSignals()
+        self.signals.loaded.connect(self._on_loaded)
+
+    def get(self, path: str):
+        image = self.images.get(path)
+        if image is not None:
+            self.images.move_to_end(path)
+        return image
+
+    def load(self, path: str) -> QImage:
+        image = self.get(path)
+        if image is None:
+            count('image_cache.misses')
+            image = read_image(path, self.max_size)
+            self._insert(path, image)
+        else:
+            count('image_cache.hits')
+        return image
+
+    def prefetch(self, paths):
+        for path in paths:
+            if path in self.images or path in self.pending:
+                continue
+            self.pending.add(path)
+            self.pool.start(_LoadTask(path, self.max_size, self.signals))
+
+    def clear(self):
+        self.pool.clear()
+        self.images.clear()
+        self.pending.clear()
+        self.total_bytes = 0
+
+    def wait(self):
+        self.pool.waitForDone()
+
+    def _on_loaded(self, path, image):
+        if path not in self.pending:
+            return
+        self.pending.discard(path)
+        if path not in self.images:
+            self._insert(path, image)
+
+    def _insert(self, path, image):
+        if image.isNull():
+            return
+        self.images[path] = image
+        self.total_bytes += image.sizeInBytes()
+        while self.total_bytes > self.max_bytes and len(self.images) > 1:
+            _, evicted = self.images.popitem(last=False)
+            self.total_bytes -= evicted.sizeInBytes()
@@ -0,0 +1,91 @@
+import threading
+from pathlib import Path
+from PyQt5.QtCore import QObject, pyqtSignal
+
+class Prelabeler(QObject):
+    predicted = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, weights_path: Path, class_names, conf=0.4, imgsz=640, batch_size=8,
+                 lookahead=64, device='cpu', parent=None):
+        super().__init__(parent)
+        self.weights_path = weights_path
+        self.class_names = set(class_names)
+        self.conf = conf
+        self.imgsz = imgsz
+        self.batch_size = batch_size
+        self.lookahead = lookahead
+        self.device = device
+        self.predictions = {}
+        self.image_files = []
+        self.cursor = 0
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self, image_files, cursor=0):
+        with self.condition:
+            if [str(p) for p in image_files] != [str(p) for p in self.image_files]:
+                self.predictions = {}
+            self.image_files = list(image_files)
+            self.cursor = cursor
+            self.running = True
+            self.condition.notify_all()
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def set_cursor(self, cursor):
+        with self.condition:
+            self.cursor = cursor
+            self.condition.notify_all()
+
+    def get(self, path):
+        with self.condition:
+            return self.predictions.get(str(path))
+
+    def _next_batch(self):
+        with self.condition:
+            while self.running:
+                end = min(self.cursor + self.lookahead, len(self.image_files))
+                batch = [p for p in self.image_files[self.cursor:end] if str(p) not in self.predictions]
+                if batch:
+                    return batch[:self.batch_size]
+                self.condition.wait()
+            return []
+
+    def _run(self):
+        try:
+            from ultralytics import YOLO
+            model = YOLO(str(self.weights_path))
+        except Exception as e:
+            self.failed.emit(str(e))
+            self.stop()
+            return
+
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                results = model.predict([str(p) for p in batch], imgsz=self.imgsz, conf=self.conf,
+                                        device=self.device, verbose=False)
+            except Exception as e:
+                self.failed.emit(str(e))
+                self.stop()
+                return
+
+            for path, result in zip(batch, results):
+                boxes = []
+                for class_id, xyxyn in zip(result.boxes.cls.tolist(), result.boxes.xyxyn.tolist()):
+                    label = result.names[int(class_id)]
+                    if label in self.class_names:
+                        boxes.append((label, *xyxyn))
+                with self.condition:
+                    self.predictions[str(path)] = boxes
+                self.predicted.emit(str(path))
@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import functools
+from pathlib import Path
+
+TRACE_ENV = "PIPELINE_TRACE"
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+_trace_path = os.environ.get(TRACE_ENV) or None
+_lock = threading.Lock()
+_file = None
+_file_pid = None
+_counters = {}
+_profiler = None
+
+def enabled() -> bool:
+    return _trace_path is not None
+
+def _write(record: dict):
+    global _file, _file_pid
+    line = json.dumps(record, default=str) + "\n"
+    with _lock:
+        if _file is None or _file_pid != os.getpid():
+            Path(_trace_path).parent.mkdir(parents=True, exist_ok=True)
+            _file = open(_trace_path, 'a', buffering=1)
+            _file_pid = os.getpid()
+        _file.write(line)
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, counter: str, value=1):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.counters = {}
+
+    def __enter__(self):
+        self.wall_start = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record = {
+            'type': 'span',
+            'name': self.name,
+            'start': self.wall_start,
+            'ms': (time.perf_counter() - self.started) * 1000,
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name
+        }
+        if self.counters:
+            record['counters'] = self.counters
+        if self.attrs:
+            record['attrs'] = self.attrs
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        _write(record)
+        return False
+
+    def add(self, counter: str, value=1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+def span(name: str, **attrs):
+    if _trace_path is None:
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+def record_span(name: str, ms: float, counters: dict = None, **attrs):
+    if _trace_path is None:
+        return
+    record = {'type': 'span', 'name': name, 'start': time.time() - ms / 1000, 'ms': ms, 'pid': os.getpid(),
+              'thread': threading.current_thread().name}
+    if counters:
+        record['counters'] = counters
+    if attrs:
+        record['attrs'] = attrs
+    _write(record)
+
+def traced(name: str = None):
+    def decorate(function):
+        span_name = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _trace_path is None:
+                return function(*args, **kwargs)
+            with Span(span_name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(counter: str, value=1):
+    if _trace_path is None:
+        return
+    with _lock:
+        _counters[counter] = _counters.get(counter, 0) + value
+
+def _flush_counters():
+    with _lock:
+        counters = dict(_counters)
+        _counters.clear()
+    if counters:
+        _write({'type': 'counters', 'pid': os.getpid(), 'time': time.time(), 'counters': counters})
+
+def _start_profiler(script: str, target: str):
+    global _profiler
+    if target.endswith('.svg') or target.endswith('.speedscope'):
+        import shutil
+        import subprocess
+        py_spy = shutil.which('py-spy')
+        if py_spy is None:
+            print(f"{PROFILE_ENV}={target} needs py-spy on PATH, profiling disabled", file=sys.stderr)
+            return
+        file_format = 'flamegraph' if target.endswith('.svg') else 'speedscope'
+        _profiler = subprocess.Popen([py_spy, 'record', '--pid', str(os.getpid()), '--format', file_format,
+                                      '--output', target, '--subprocesses'])
+        return
+
+    import cProfile
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+
+def _stop_profiler(target: str):
+    if _profiler is None:
+        return
+    if hasattr(_profiler, 'dump_stats'):
+        _profiler.disable()
+        _profiler.dump_stats(target)
+    else:
+        import signal
+        _profiler.send_signal(signal.SIGINT)
+        _profiler.wait()
+
+def install(script: str):
+    profile_target = os.environ.get(PROFILE_ENV)
+    if profile_target:
+        _start_profiler(script, profile_target)
+        atexit.register(_stop_profiler, profile_target)
+    if _trace_path is None:
+        return
+
+    started = time.perf_counter()
+    _write({'type': 'process', 'script': script, 'pid': os.getpid(), 'argv': sys.argv[1:], 'start': time.time()})
+
+    def finish():
+        _flush_counters()
+        _write({'type': 'exit', 'script': script, 'pid': os.getpid(), 'ms': (time.perf_counter() - started) * 1000})
+    atexit.register(finish)
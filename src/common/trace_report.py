@@ -0,0 +1,86 @@
+import json
+import argparse
+import numpy as np
+from pathlib import Path
+
+SORT_KEYS = ['total', 'count', 'mean', 'p95']
+
+def read_trace(trace_path: Path):
+    records = []
+    with open(trace_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+def summarize(records):
+    spans = {}
+    counters = {}
+    for record in records:
+        if record['type'] == 'span':
+            entry = spans.setdefault(record['name'], {'ms': [], 'counters': {}, 'errors': 0})
+            entry['ms'].append(record['ms'])
+            entry['errors'] += 'error' in record
+            for counter, value in record.get('counters', {}).items():
+                entry['counters'][counter] = entry['counters'].get(counter, 0) + value
+        elif record['type'] == 'counters':
+            for counter, value in record['counters'].items():
+                counters[counter] = counters.get(counter, 0) + value
+
+    rows = []
+    for name, entry in spans.items():
+        ms = np.array(entry['ms'])
+        rows.append({
+            'name': name,
+            'count': len(ms),
+            'total': ms.sum() / 1000,
+            'mean': ms.mean(),
+            'p50': float(np.percentile(ms, 50)),
+            'p95': float(np.percentile(ms, 95)),
+            'max': ms.max(),
+            'errors': entry['errors'],
+            'counters': entry['counters']
+        })
+    return rows, counters
+
+def print_report(records, sort_key: str = 'total'):
+    processes = [r for r in records if r['type'] == 'exit']
+    for process in processes:
+        print(f"{process['script']} (pid {process['pid']}): {process['ms'] / 1000:.1f} s")
+
+    rows, counters = summarize(records)
+    rows.sort(key=lambda row: -row[sort_key])
+    print(f"\n{'span':<36} {'count':>7} {'total s':>9} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for row in rows:
+        print(f"{row['name'][:36]:<36} {row['count']:>7} {row['total']:>9.2f} {row['mean']:>9.2f} "
+              f"{row['p50']:>8.2f} {row['p95']:>8.2f} {row['max']:>8.2f}")
+        for counter, value in sorted(row['counters'].items()):
+            rate = value / row['total'] if row['total'] > 0 else 0.0
+            print(f"    {counter:<32} {value:>12.0f}  ({rate:.1f}/s)")
+
+    if counters:
+        print(f"\n{'counter':<36} {'value':>12}")
+        for counter, value in sorted(counters.items()):
+            print(f"{counter:<36} {value:>12.0f}")
+    return rows
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'trace',
+        type=Path
+    )
+    parser.add_argument(
+        '--sort',
+        choices=SORT_KEYS,
+        default='total'
+    )
+
+    args = parser.parse_args()
+
+    print_report(read_trace(args.trace), args.sort)
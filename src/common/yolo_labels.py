@@ -0,0 +1,369 @@
+import os
+import sys
+import argparse
+import numpy as np
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common.instrumentation import span, install
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+LABEL_CACHE_NAME = ".labels_cache.npz"
+CACHE_VERSION = 1
+EMPTY_ROWS = np.zeros((0, 5), dtype=np.float32)
+
+def load_class_names(classes_file: Path):
+    with open(classes_file, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def _parse_lines(lines):
+    rows, line_numbers, issues = [], [], []
+    for number, line in lines:
+        parts = line.split()
+        if len(parts) != 5:
+            issues.append((number, f"expected 5 values, got {len(parts)}"))
+            continue
+        try:
+            rows.append([float(p) for p in parts])
+        except ValueError:
+            issues.append((number, "not a number"))
+            continue
+        line_numbers.append(number)
+    return np.array(rows, dtype=np.float32).reshape(-1, 5), np.array(line_numbers, dtype=np.int64), issues
+
+def _split_lines(text: str):
+    lines = [(number, line) for number, line in enumerate(text.splitlines(), 1) if line.strip()]
+    parts = [line.split() for _, line in lines]
+    if any(len(p) != 5 for p in parts):
+        return lines, None
+    return lines, [token for p in parts for token in p]
+
+def validate_rows(rows, num_classes: int = None):
+    classes = rows[:, 0]
+    bad_class = (classes != np.round(classes)) | (classes < 0)
+    if num_classes is not None:
+        bad_class |= classes >= num_classes
+    bad_value = ~np.isfinite(rows).all(axis=1) & ~bad_class
+
+    half = rows[:, 3:5] / 2
+    corners = np.concatenate([rows[:, 1:3] - half, rows[:, 1:3] + half], axis=1)
+    clipped_corners = np.clip(corners, 0, 1)
+    sizes = clipped_corners[:, 2:] - clipped_corners[:, :2]
+    empty = (sizes <= 0).any(axis=1) & ~bad_class & ~bad_value
+    keep = ~(bad_class | bad_value | empty)
+    clipped = (clipped_corners != corners).any(axis=1) & keep
+
+    issues = []
+    for mask, message in ((bad_class, "class id out of range"), (bad_value, "non-finite value"),
+                          (empty, "box lies outside the image"), (clipped, "box clipped to the image")):
+        issues.extend((int(i), message) for i in np.flatnonzero(mask))
+    if clipped.any():
+        rows = rows.copy()
+        rows[clipped, 1:3] = (clipped_corners[clipped, :2] + clipped_corners[clipped, 2:]) / 2
+        rows[clipped, 3:5] = sizes[clipped]
+    return rows[keep], issues
+
+def parse_labels(text: str, num_classes: int = None):
+    lines, tokens = _split_lines(text)
+    rows = None
+    if tokens is not None:
+        try:
+            rows = np.array(tokens, dtype=np.float32).reshape(-1, 5)
+            line_numbers = np.array([number for number, _ in lines], dtype=np.int64)
+            issues = []
+        except ValueError:
+            rows = None
+    if rows is None:
+        rows, line_numbers, issues = _parse_lines(lines)
+    if len(rows) == 0:
+        return EMPTY_ROWS, issues
+
+    rows, row_issues = validate_rows(rows, num_classes)
+    issues.extend((int(line_numbers[i]), message) for i, message in row_issues)
+    return rows, sorted(issues)
+
+def parse_label_texts(texts, num_classes: int = None):
+    results = [None] * len(texts)
+    token_lists, line_lists, batch = [], [], []
+    for i, text in enumerate(texts):
+        lines, tokens = _split_lines(text)
+        if tokens is None:
+            results[i] = parse_labels(text, num_classes)
+        else:
+            token_lists.append(tokens)
+            line_lists.append(lines)
+            batch.append(i)
+    if not batch:
+        return results
+
+    try:
+        rows = np.array([token for tokens in token_lists for token in tokens], dtype=np.float32).reshape(-1, 5)
+    except ValueError:
+        for i in batch:
+            results[i] = parse_labels(texts[i], num_classes)
+        return results
+
+    lengths = np.array([len(lines) for lines in line_lists], dtype=np.int64)
+    owners = np.repeat(np.arange(len(batch)), lengths)
+    line_numbers = np.array([number for lines in line_lists for number, _ in lines], dtype=np.int64)
+    keep = np.ones(len(rows), dtype=bool)
+    issues = {}
+    if len(rows):
+        validated, row_issues = validate_rows(rows, num_classes)
+        if row_issues:
+            for index, message in row_issues:
+                issues.setdefault(int(owners[index]), []).append((int(line_numbers[index]), message))
+            keep[[index for index, message in row_issues if message != "box clipped to the image"]] = False
+        rows = validated
+    kept_lengths = np.bincount(owners[keep], minlength=len(batch))
+    offsets = np.concatenate([[0], np.cumsum(kept_lengths)])
+    for j, i in enumerate(batch):
+        results[i] = (rows[offsets[j]:offsets[j + 1]], sorted(issues.get(j, [])))
+    return results
+
+def read_label_file(label_path: Path, num_classes: int = None):
+    try:
+        with open(label_path, 'r') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return EMPTY_ROWS, []
+    return parse_labels(text, num_classes)
+
+def format_labels(rows) -> str:
+    rows = np.asarray(rows, dtype=np.float64).reshape(-1, 5)
+    return "".join(f"{int(c)} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n" for c, x, y, w, h in rows.tolist())
+
+def write_label_file(label_path: Path, rows):
+    temporary = label_path.with_name(f".{label_path.name}.tmp")
+    with open(temporary, 'w') as f:
+        f.write(format_labels(rows))
+    os.replace(temporary, label_path)
+
+def write_label_files(label_dir: Path, labels: dict, workers: int = 8):
+    label_dir.mkdir(parents=True, exist_ok=True)
+    with span('labels.write', files=len(labels)), ThreadPool(max(workers, 1)) as pool:
+        pool.starmap(write_label_file, [(label_dir / f"{stem}.txt", rows) for stem, rows in labels.items()],
+                     chunksize=64)
+
+def to_xyxy(rows, width: int, height: int):
+    rows = np.asarray(rows, dtype=np.float32).reshape(-1, 5)
+    cx, cy, w, h = rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+    return np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+def to_xywhn(class_ids, boxes, width: int, height: int):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    rows = np.empty((len(boxes), 5), dtype=np.float32)
+    rows[:, 0] = class_ids
+    rows[:, 1] = (boxes[:, 0] + boxes[:, 2]) / 2 / width
+    rows[:, 2] = (boxes[:, 1] + boxes[:, 3]) / 2 / height
+    rows[:, 3] = (boxes[:, 2] - boxes[:, 0]) / width
+    rows[:, 4] = (boxes[:, 3] - boxes[:, 1]) / height
+    return rows
+
+class LabelSet:
+    def __init__(self, stems, offsets, rows, issues=None):
+        self.stems = list(stems)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.rows = np.asarray(rows, dtype=np.float32).reshape(-1, 5)
+        self.issues = issues or {}
+        self.positions = {stem: i for i, stem in enumerate(self.stems)}
+
+    def __len__(self):
+        return len(self.stems)
+
+    def __contains__(self, stem):
+        return stem in self.positions
+
+    def get(self, stem: str):
+        i = self.positions.get(stem)
+        if i is None:
+            return EMPTY_ROWS
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def boxes(self, stem: str, width: int, height: int):
+        rows = self.get(stem)
+        return to_xyxy(rows, width, height), rows[:, 0].astype(np.int64)
+
+    def file_index(self):
+        return np.repeat(np.arange(len(self.stems)), np.diff(self.offsets))
+
+    def class_counts(self, num_classes: int):
+        flat = self.file_index() * num_classes + self.rows[:, 0].astype(np.int64)
+        return np.bincount(flat, minlength=len(self.stems) * num_classes).reshape(len(self.stems), num_classes)
+
+    def subset(self, stems):
+        stems = list(stems)
+        parts = [self.get(stem) for stem in stems]
+        offsets = np.cumsum([0] + [len(part) for part in parts])
+        rows = np.concatenate(parts) if parts else EMPTY_ROWS
+        return LabelSet(stems, offsets, rows, {s: self.issues[s] for s in stems if s in self.issues})
+
+def label_signatures(label_dir: Path):
+    stems, signatures = [], []
+    with os.scandir(label_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.txt') and not entry.name.startswith('.'):
+                stat = entry.stat()
+                stems.append(entry.name[:-4])
+                signatures.append((stat.st_mtime_ns, stat.st_size))
+    order = sorted(range(len(stems)), key=stems.__getitem__)
+    return [stems[i] for i in order], np.array(signatures, dtype=np.int64).reshape(-1, 2)[order]
+
+def _ranges(starts, lengths):
+    within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + within
+
+def _read_text(label_path: Path):
+    try:
+        with open(label_path, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return ""
+
+def _read_cache(cache_path: Path, num_classes):
+    if not cache_path.exists():
+        return None
+    try:
+        with np.load(cache_path) as cache:
+            if int(cache['version']) != CACHE_VERSION or int(cache['num_classes']) != (num_classes or -1):
+                return None
+            return {key: cache[key] for key in cache.files}
+    except (OSError, KeyError, ValueError):
+        return None
+
+def _cached_issues(cache: dict):
+    issues = {}
+    for stem, number, message in zip(cache['issue_stems'].tolist(), cache['issue_lines'].tolist(),
+                                     cache['issue_messages'].tolist()):
+        issues.setdefault(stem, []).append((number, message))
+    return issues
+
+def _write_cache(cache_path: Path, num_classes, signatures, label_set: LabelSet):
+    issues = [(stem, number, message) for stem, file_issues in label_set.issues.items()
+              for number, message in file_issues]
+    temporary = cache_path.with_name(f"{cache_path.name}.tmp.npz")
+    try:
+        np.savez(
+            temporary,
+            version=CACHE_VERSION,
+            num_classes=num_classes or -1,
+            stems=np.array(label_set.stems, dtype=str),
+            signatures=signatures,
+            offsets=label_set.offsets,
+            rows=label_set.rows,
+            issue_stems=np.array([i[0] for i in issues], dtype=str),
+            issue_lines=np.array([i[1] for i in issues], dtype=np.int64),
+            issue_messages=np.array([i[2] for i in issues], dtype=str)
+        )
+        os.replace(temporary, cache_path)
+    except OSError:
+        pass
+
+def load_label_dir(label_dir: Path, num_classes: int = None, workers: int = 8, use_cache: bool = True,
+                   chunk_size: int = 20000):
+    if not label_dir.exists():
+        return LabelSet([], [0], EMPTY_ROWS)
+
+    cache_path = label_dir / LABEL_CACHE_NAME
+    with span('labels.load', directory=label_dir.name) as s:
+        stems, signatures = label_signatures(label_dir)
+        cache = _read_cache(cache_path, num_classes) if use_cache else None
+
+        source = np.full(len(stems), -1, dtype=np.int64)
+        if cache is not None:
+            positions = {stem: i for i, stem in enumerate(cache['stems'].tolist())}
+            source = np.array([positions.get(stem, -1) for stem in stems], dtype=np.int64)
+            found = source >= 0
+            unchanged = np.zeros(len(stems), dtype=bool)
+            unchanged[found] = (cache['signatures'][source[found]] == signatures[found]).all(axis=1)
+            source[~unchanged] = -1
+        stale = np.flatnonzero(source < 0)
+        s.add('files', len(stems))
+        s.add('parsed', len(stale))
+
+        parsed = []
+        with ThreadPool(max(workers, 1)) as pool:
+            for start in range(0, len(stale), chunk_size):
+                chunk = stale[start:start + chunk_size]
+                texts = pool.map(_read_text, [label_dir / f"{stems[i]}.txt" for i in chunk], chunksize=256)
+                parsed.extend(parse_label_texts(texts, num_classes))
+
+        lengths = np.zeros(len(stems), dtype=np.int64)
+        reused = np.flatnonzero(source >= 0)
+        if cache is not None:
+            lengths[reused] = np.diff(cache['offsets'])[source[reused]]
+        lengths[stale] = [len(rows) for rows, _ in parsed]
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        rows = np.empty((offsets[-1], 5), dtype=np.float32)
+
+        issues = {}
+        if len(reused):
+            rows[_ranges(offsets[reused], lengths[reused])] = \
+                cache['rows'][_ranges(cache['offsets'][source[reused]], lengths[reused])]
+            cached_issues = _cached_issues(cache)
+            for i in reused:
+                if stems[i] in cached_issues:
+                    issues[stems[i]] = cached_issues[stems[i]]
+        for i, (file_rows, file_issues) in zip(stale, parsed):
+            rows[offsets[i]:offsets[i + 1]] = file_rows
+            if file_issues:
+                issues[stems[i]] = file_issues
+        label_set = LabelSet(stems, offsets, rows, issues)
+
+    if use_cache and (len(stale) or cache is None or len(cache['stems']) != len(stems)):
+        _write_cache(cache_path, num_classes, signatures, label_set)
+    return label_set
+
+def print_label_report(label_set: LabelSet, class_names, max_issues: int = 50):
+    counts = label_set.class_counts(len(class_names))
+    print(f"{len(label_set)} label files, {len(label_set.rows)} boxes, {int((counts.sum(axis=1) == 0).sum())} empty")
+    for class_id, name in enumerate(class_names):
+        print(f"{name:<24} {int(counts[:, class_id].sum()):>10} boxes {int((counts[:, class_id] > 0).sum()):>10} files")
+
+    issues = [(stem, number, message) for stem, file_issues in sorted(label_set.issues.items())
+              for number, message in file_issues]
+    if issues:
+        print(f"\n{len(issues)} problems in {len(label_set.issues)} files:")
+        for stem, number, message in issues[:max_issues]:
+            print(f"  {stem}.txt:{number}: {message}")
+        if len(issues) > max_issues:
+            print(f"  ... and {len(issues) - max_issues} more")
+
+if __name__ == "__main__":
+    install('yolo_labels')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'label_dir',
+        type=Path,
+        nargs='?',
+        default=PROJECT_ROOT / "data/extracted_frames_labels"
+    )
+    parser.add_argument(
+        '--classes',
+        type=Path,
+        default=PROJECT_ROOT / "classes.txt"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--max-issues',
+        type=int,
+        default=50
+    )
+
+    args = parser.parse_args()
+
+    class_names = load_class_names(args.classes)
+    label_set = load_label_dir(args.label_dir, len(class_names), args.workers, not args.no_cache)
+    print_label_report(label_set, class_names, args.max_issues)
@@ -0,0 +1,231 @@
+import os
+import cv2
+import sys
+import argparse
+import itertools
+import numpy as np
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+from tqdm import tqdm
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from data_preparation.frame_sampling import dhash
+from data_preparation.split_engine import SPLIT_NAMES, SPLIT_MANIFEST_NAME, load_split_manifest, save_split_manifest
+from common.instrumentation import span, install
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+HASH_CACHE_NAME = ".dhash_cache.npz"
+IMAGE_EXTENSIONS = ['.jpg', '.webp', '.png']
+DEDUP_ACTIONS = ['report', 'remove', 'reassign']
+CHUNK_BITS = 16
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def popcount(values):
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    return _POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+def image_hash(image_path: Path) -> int:
+    image = cv2.imread(str(image_path), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None:
+        return None
+    return int(np.frombuffer(dhash(image).tobytes(), dtype='>u8')[0])
+
+def list_split_images(processed_dir: Path):
+    images = []
+    for split_name in SPLIT_NAMES:
+        directory = processed_dir / "images" / split_name
+        if directory.exists():
+            images.extend((split_name, p) for p in sorted(directory.iterdir())
+                          if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return images
+
+def compute_hashes(image_paths, cache_path: Path, workers: int = 8):
+    signatures = np.array([(s.st_mtime_ns, s.st_size) for s in (p.stat() for p in image_paths)],
+                          dtype=np.int64).reshape(-1, 2)
+    keys = [str(p) for p in image_paths]
+
+    cached = {}
+    if cache_path.exists():
+        with np.load(cache_path) as cache:
+            cached = {key: (tuple(signature), value) for key, signature, value in
+                      zip(cache['paths'].tolist(), cache['signatures'].tolist(), cache['hashes'].tolist())}
+
+    hashes = np.zeros(len(image_paths), dtype=np.uint64)
+    valid = np.ones(len(image_paths), dtype=bool)
+    stale = []
+    for i, key in enumerate(keys):
+        entry = cached.get(key)
+        if entry is not None and entry[0] == tuple(signatures[i]):
+            hashes[i] = entry[1]
+        else:
+            stale.append(i)
+
+    with span('dedup.hash', images=len(image_paths)) as trace, ThreadPool(max(workers, 1)) as pool:
+        results = pool.imap(image_hash, [image_paths[i] for i in stale], chunksize=16)
+        for i, value in tqdm(zip(stale, results), total=len(stale), desc="Hashing images", unit="img"):
+            if value is None:
+                valid[i] = False
+            else:
+                hashes[i] = value
+        trace.add('hashed', len(stale))
+
+    if stale:
+        temporary = cache_path.with_name(f"{cache_path.name}.tmp.npz")
+        np.savez(temporary, paths=np.array(keys, dtype=str)[valid], signatures=signatures[valid], hashes=hashes[valid])
+        os.replace(temporary, cache_path)
+    return hashes, valid
+
+def _flip_masks(bits: int, radius: int):
+    masks = [0]
+    for r in range(1, radius + 1):
+        masks.extend(sum(1 << b for b in combination) for combination in itertools.combinations(range(bits), r))
+    return np.array(masks, dtype=np.uint64)
+
+def near_duplicate_pairs(hashes, threshold: int):
+    chunks = 64 // CHUNK_BITS
+    radius = threshold // chunks
+    chunk_mask = np.uint64((1 << CHUNK_BITS) - 1)
+    flips = _flip_masks(CHUNK_BITS, radius).astype(np.int64)
+
+    found = []
+    for c in range(chunks):
+        keys = ((hashes >> np.uint64(c * CHUNK_BITS)) & chunk_mask).astype(np.int64)
+        order = np.argsort(keys, kind='stable')
+        bucket_sizes = np.bincount(keys, minlength=1 << CHUNK_BITS)
+        bucket_starts = np.cumsum(bucket_sizes) - bucket_sizes
+        for flip in flips:
+            probe = keys ^ flip
+            lo, counts = bucket_starts[probe], bucket_sizes[probe]
+            queries = np.repeat(np.arange(len(hashes)), counts)
+            within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            matches = order[np.repeat(lo, counts) + within]
+            keep = queries < matches
+            queries, matches = queries[keep], matches[keep]
+            close = popcount(hashes[queries] ^ hashes[matches]) <= threshold
+            found.append(queries[close] * len(hashes) + matches[close])
+
+    pairs = np.unique(np.concatenate(found))
+    return np.stack([pairs // len(hashes), pairs % len(hashes)], axis=1)
+
+def match_duplicates(hashes, threshold: int):
+    unique, inverse = np.unique(hashes, return_inverse=True)
+    with span('dedup.match', images=len(hashes), unique=len(unique)) as trace:
+        pairs = near_duplicate_pairs(unique, threshold) if threshold > 0 else np.zeros((0, 2), dtype=np.int64)
+        trace.add('pairs', len(pairs))
+    return inverse.reshape(-1), pairs
+
+def find_leaks(split_ids, inverse, pairs):
+    counts = np.zeros((inverse.max() + 1 if len(inverse) else 0, len(SPLIT_NAMES)), dtype=np.int64)
+    np.add.at(counts, (inverse, split_ids), 1)
+    present = counts > 0
+    neighbours = np.zeros_like(present)
+    np.logical_or.at(neighbours, pairs[:, 0], present[pairs[:, 1]])
+    np.logical_or.at(neighbours, pairs[:, 1], present[pairs[:, 0]])
+
+    earlier = (present | neighbours)[inverse] & (np.arange(len(SPLIT_NAMES))[None, :] < split_ids[:, None])
+    leaked = earlier.any(axis=1)
+    duplicated = (counts[inverse, split_ids] > 1) | neighbours[inverse, split_ids]
+    return leaked, earlier.argmax(axis=1), duplicated & ~leaked
+
+def resolve_targets(split_ids, inverse, pairs):
+    targets = split_ids.copy()
+    while True:
+        leaked, earliest, _ = find_leaks(targets, inverse, pairs)
+        if not leaked.any():
+            return targets
+        targets[leaked] = earliest[leaked]
+
+def print_leak_report(images, split_ids, leaked, earliest, duplicated, examples: int = 10):
+    print(f"{int(leaked.sum())} of {len(images)} images have a near-duplicate in an earlier split")
+    for k, split_name in enumerate(SPLIT_NAMES):
+        for j in range(k):
+            n = int((leaked & (split_ids == k) & (earliest == j)).sum())
+            if n:
+                print(f"  {split_name:<6} -> {SPLIT_NAMES[j]:<6} {n:>8} images")
+    print(f"{int(duplicated.sum())} images have a near-duplicate within their own split")
+    for i in np.flatnonzero(leaked)[:examples]:
+        print(f"  {images[i][0]}/{images[i][1].name} ~ {SPLIT_NAMES[earliest[i]]}")
+
+def resolve_leaks(processed_dir: Path, images, split_ids, targets, action: str):
+    manifest_path = processed_dir / SPLIT_MANIFEST_NAME
+    manifest = load_split_manifest(manifest_path)
+    overrides = manifest.setdefault('overrides', {})
+    excluded = set(manifest.get('excluded', []))
+    files = manifest.setdefault('files', {})
+
+    moved = np.flatnonzero(targets != split_ids)
+    for i in moved:
+        split_name, image_path = images[i]
+        stem = image_path.stem
+        label_path = processed_dir / "labels" / split_name / f"{stem}.txt"
+        if action == 'remove':
+            image_path.unlink()
+            if label_path.exists():
+                label_path.unlink()
+            excluded.add(stem)
+            overrides.pop(stem, None)
+            files.pop(stem, None)
+        else:
+            target = SPLIT_NAMES[targets[i]]
+            os.replace(image_path, processed_dir / "images" / target / image_path.name)
+            if label_path.exists():
+                os.replace(label_path, processed_dir / "labels" / target / label_path.name)
+            overrides[stem] = target
+            files[stem] = target
+
+    manifest['excluded'] = sorted(excluded)
+    save_split_manifest(manifest_path, manifest)
+    print(f"{'Removed' if action == 'remove' else 'Reassigned'} {len(moved)} images, {manifest_path} updated")
+    return len(moved)
+
+def dedup_dataset(processed_dir: Path, threshold: int = 4, workers: int = 8, action: str = 'report',
+                  examples: int = 10):
+    images = list_split_images(processed_dir)
+    hashes, valid = compute_hashes([p for _, p in images], processed_dir / HASH_CACHE_NAME, workers)
+    images = [image for image, ok in zip(images, valid) if ok]
+    split_ids = np.array([SPLIT_NAMES.index(split_name) for split_name, _ in images], dtype=np.int64)
+    inverse, pairs = match_duplicates(hashes[valid], threshold)
+
+    leaked, earliest, duplicated = find_leaks(split_ids, inverse, pairs)
+    print_leak_report(images, split_ids, leaked, earliest, duplicated, examples)
+    if leaked.any() and action != 'report':
+        targets = np.where(leaked, -1, split_ids) if action == 'remove' else resolve_targets(split_ids, inverse, pairs)
+        resolve_leaks(processed_dir, images, split_ids, targets, action)
+    return leaked
+
+if __name__ == "__main__":
+    install('dedup_dataset')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=PROJECT_ROOT / "data/processed"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=4
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8
+    )
+    parser.add_argument(
+        "--action",
+        choices=DEDUP_ACTIONS,
+        default="report"
+    )
+    parser.add_argument(
+        "--examples",
+        type=int,
+        default=10
+    )
+
+    args = parser.parse_args()
+
+    dedup_dataset(args.data_dir, args.threshold, args.workers, args.action, args.examples)
@@ -1,65 +1,375 @@
 import cv2
 import sys
+import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from tqdm import tqdm
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from data_preparation.frame_writer import FrameWriter, IMAGE_FORMATS
+from data_preparation.frame_sampling import SceneChangeSampler, dhash, SAMPLING_MODES
+from data_preparation.extraction_manifest import ExtractionManifest, MANIFEST_NAME, label_path_for
+from common.instrumentation import span, install
+
+VIDEO_EXTENSIONS = ['.mov']
+
+def find_videos(video_dir: Path):
+    return sorted(p for p in video_dir.glob('*') if p.suffix.lower() in VIDEO_EXTENSIONS)
+
+def count_video_frames(video_path: Path) -> int:
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        return 0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return max(total, 0)
+
+def plan_chunks(total_frames: int, frame_stride: int, chunk_frames: int):
+    if total_frames <= 0 or chunk_frames <= 0:
+        return [(0, None)]
+
+    chunk_frames = max(frame_stride, chunk_frames - chunk_frames % frame_stride)
+    starts = list(range(0, total_frames, chunk_frames))
+    return [(start, starts[i + 1] if i + 1 < len(starts) else None) for i, start in enumerate(starts)]
+
+def open_video_at(video_path: Path, start_frame: int):
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        return None
+    if start_frame <= 0:
+        return cap
+
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == start_frame:
+        return cap
+
+    cap.release()
+    cap = cv2.VideoCapture(str(video_path))
+    for _ in range(start_frame):
+        if not cap.grab():
+            break
+    return cap
+
+def frame_filename(video_path: Path, frame_index: int, extension: str) -> str:
+    return f"{video_path.stem}_frame_{frame_index:05d}.{extension}"
+
+def extract_chunk(
+    video_path: Path,
+    output_dir: Path,
+    frame_stride: int,
+    start_frame: int,
+    end_frame,
+    writer_options: dict = None,
+    sampler_options: dict = None
+):
+    with span('extract.chunk', video=video_path.name, start_frame=start_frame) as trace:
+        result = {'frames_scanned': 0, 'frames_saved': 0, 'frames_dropped': 0, 'bytes_written': 0, 'frames': [],
+                  'hashes': []}
+        cap = open_video_at(video_path, start_frame)
+        if cap is None:
+            return result
+
+        writer_options = writer_options or {}
+        extension = writer_options.get('image_format', 'jpg')
+        sampler = SceneChangeSampler(**sampler_options) if sampler_options is not None else None
+        frame_index = start_frame
+        with FrameWriter(**writer_options) as writer:
+            while end_frame is None or frame_index < end_frame:
+                if frame_index % frame_stride == 0:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    if sampler is not None:
+                        frame_hash = dhash(frame, sampler.hash_size)
+                        result['hashes'].append((frame_index, frame_hash))
+                    if sampler is None or sampler.keep_hash(frame_index, frame_hash):
+                        filename = frame_filename(video_path, frame_index, extension)
+                        writer.submit(output_dir / filename, frame)
+                        result['frames'].append((frame_index, filename))
+                elif not cap.grab():
+                    break
+
+                frame_index += 1
+
+            cap.release()
+
+        result['frames_scanned'] = frame_index - start_frame
+        result['frames_saved'] = writer.frames_written
+        result['frames_dropped'] = sampler.dropped if sampler is not None else 0
+        result['bytes_written'] = writer.bytes_written
+        trace.add('frames_decoded', result['frames_saved'] + result['frames_dropped'])
+        trace.add('frames_scanned', result['frames_scanned'])
+        trace.add('frames_saved', result['frames_saved'])
+        trace.add('bytes_written', result['bytes_written'])
+        return result
+
+def reconcile_scene_chunks(video_path: Path, output_dir: Path, results, writer_options: dict, sampler_options: dict):
+    extension = writer_options.get('image_format', 'jpg')
+    sampler = SceneChangeSampler(**sampler_options)
+    written = {frame_index: filename for result in results for frame_index, filename in result['frames']}
+    kept = [frame_index for result in results for frame_index, frame_hash in result['hashes']
+            if sampler.keep_hash(frame_index, frame_hash)]
+
+    removed_bytes = 0
+    for frame_index in set(written) - set(kept):
+        path = output_dir / written[frame_index]
+        if path.exists() and not label_path_for(output_dir, path.name).exists():
+            removed_bytes += path.stat().st_size
+            path.unlink()
+
+    missing = [frame_index for frame_index in kept if frame_index not in written]
+    with FrameWriter(**writer_options) as writer:
+        for frame_index in missing:
+            cap = open_video_at(video_path, frame_index)
+            ret, frame = cap.read() if cap is not None else (False, None)
+            if cap is not None:
+                cap.release()
+            if ret:
+                writer.submit(output_dir / frame_filename(video_path, frame_index, extension), frame)
+
+    frames = [(frame_index, frame_filename(video_path, frame_index, extension)) for frame_index in kept]
+    return frames, {
+        'frames_saved': len(kept) - sum(r['frames_saved'] for r in results),
+        'frames_dropped': sampler.dropped - sum(r['frames_dropped'] for r in results),
+        'bytes_written': writer.bytes_written - removed_bytes
+    }
+
+def _init_worker():
+    cv2.setNumThreads(1)
+
 def extract_frames_from_videos(
-    video_dir: Path, 
-    output_dir: Path, 
-    frame_stride: int
+    video_dir: Path,
+    output_dir: Path,
+    frame_stride: int,
+    workers: int = 1,
+    chunk_frames: int = 3600,
+    image_format: str = 'jpg',
+    quality: int = 95,
+    imgsz: int = None,
+    writer_threads: int = 2,
+    queue_size: int = 8,
+    sampling: str = 'stride',
+    scene_threshold: int = 10,
+    min_gap: int = 15,
+    max_gap: int = 600,
+    use_manifest: bool = True,
+    force: bool = False
 ):
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    video_extensions = ['.mov']
-    video_files = [p for p in video_dir.glob('*') if p.suffix.lower() in video_extensions]
+
+    video_files = find_videos(video_dir)
+    stats = {
+        'videos': len(video_files),
+        'frames_scanned': 0,
+        'frames_saved': 0,
+        'frames_dropped': 0,
+        'bytes_written': 0,
+        'videos_skipped': 0,
+        'seconds': 0.0
+    }
+    writer_options = {
+        'image_format': image_format,
+        'quality': quality,
+        'imgsz': imgsz,
+        'threads': writer_threads,
+        'queue_size': queue_size
+    }
+    sampler_options = None
+    if sampling == 'scene':
+        frame_stride = max(min_gap, 1)
+        sampler_options = {'threshold': scene_threshold, 'min_gap': min_gap, 'max_gap': max_gap}
 
     if not video_files:
-        return
-
-    for video_path in tqdm(video_files, desc="Extracting frames", unit="video"):
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
-            continue
-
-        frame_count = 0
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % frame_stride == 0:
-                output_filename = output_dir / f"{video_path.stem}_frame_{frame_count:05d}.jpg"
-                cv2.imwrite(str(output_filename), frame)
-
-            frame_count += 1
-        
-        cap.release()
+        return stats
+
+    settings = {
+        'frame_stride': frame_stride,
+        'chunk_frames': chunk_frames,
+        'image_format': image_format,
+        'quality': quality,
+        'imgsz': imgsz,
+        'sampler': sampler_options
+    }
+    manifest = ExtractionManifest(output_dir / MANIFEST_NAME) if use_manifest else None
+
+    started = time.perf_counter()
+    jobs = []
+    pending_chunks = {}
+    chunk_plans = {}
+    for video_path in video_files:
+        total_frames = count_video_frames(video_path)
+        done_chunks = set()
+        if manifest is not None:
+            if force:
+                manifest.forget_video(video_path, output_dir)
+            completed, done_chunks = manifest.prepare_video(video_path, settings, total_frames, output_dir)
+            if completed:
+                stats['videos_skipped'] += 1
+                continue
+            if sampler_options is not None and done_chunks:
+                manifest.forget_video(video_path, output_dir)
+                completed, done_chunks = manifest.prepare_video(video_path, settings, total_frames, output_dir)
+
+        chunk_plans[video_path] = plan_chunks(total_frames, frame_stride, chunk_frames)
+        for start_frame, end_frame in chunk_plans[video_path]:
+            if start_frame in done_chunks:
+                continue
+            jobs.append((video_path, output_dir, frame_stride, start_frame, end_frame, writer_options, sampler_options))
+            pending_chunks[video_path] = pending_chunks.get(video_path, 0) + 1
+
+        if manifest is not None and video_path not in pending_chunks:
+            manifest.mark_completed(video_path)
+
+    scene_results = {}
+
+    def add_result(job, result):
+        video_path, start_frame = job[0], job[3]
+        for key, value in result.items():
+            if key not in ('frames', 'hashes'):
+                stats[key] += value
+        pending_chunks[video_path] -= 1
+        chunks = [(start_frame, result['frames'])]
+        if sampler_options is not None:
+            scene_results.setdefault(video_path, []).append((start_frame, result))
+            if pending_chunks[video_path]:
+                return
+            results = [r for _, r in sorted(scene_results.pop(video_path), key=lambda item: item[0])]
+            frames, changes = reconcile_scene_chunks(video_path, output_dir, results, writer_options, sampler_options)
+            for key, value in changes.items():
+                stats[key] += value
+            chunks = [(start, [f for f in frames if f[0] >= start and (end is None or f[0] < end)])
+                      for start, end in chunk_plans[video_path]]
+        if manifest is not None:
+            for chunk_start, chunk_kept in chunks:
+                manifest.record_chunk(video_path, chunk_start, chunk_kept)
+            if pending_chunks[video_path] == 0:
+                manifest.mark_completed(video_path)
+
+    try:
+        if workers <= 1:
+            for job in tqdm(jobs, desc="Extracting frames", unit="chunk"):
+                add_result(job, extract_chunk(*job))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = {pool.submit(extract_chunk, *job): job for job in jobs}
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Extracting frames", unit="chunk"):
+                    add_result(futures[future], future.result())
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
 
 if __name__ == "__main__":
     PROJECT_ROOT = Path(__file__).resolve().parents[2]
-    
+    install('extract_frames')
+
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "--video-dir", 
-        type=Path, 
+        "--video-dir",
+        type=Path,
         default=PROJECT_ROOT / "data/raw"
     )
     parser.add_argument(
-        "--output-dir", 
-        type=Path, 
+        "--output-dir",
+        type=Path,
         default=PROJECT_ROOT / "data/extracted_frames"
     )
     parser.add_argument(
-        "--stride", 
-        type=int, 
+        "--stride",
+        type=int,
         default=60
     )
-    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        "--chunk-frames",
+        type=int,
+        default=3600
+    )
+    parser.add_argument(
+        "--format",
+        choices=IMAGE_FORMATS,
+        default="jpg"
+    )
+    parser.add_argument(
+        "--quality",
+        type=int,
+        default=95
+    )
+    parser.add_argument(
+        "--imgsz",
+        type=int,
+        default=None
+    )
+    parser.add_argument(
+        "--writer-threads",
+        type=int,
+        default=2
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=8
+    )
+    parser.add_argument(
+        "--sampling",
+        choices=SAMPLING_MODES,
+        default="stride"
+    )
+    parser.add_argument(
+        "--scene-threshold",
+        type=int,
+        default=10
+    )
+    parser.add_argument(
+        "--min-gap",
+        type=int,
+        default=15
+    )
+    parser.add_argument(
+        "--max-gap",
+        type=int,
+        default=600
+    )
+    parser.add_argument(
+        "--no-manifest",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true"
+    )
+
     args = parser.parse_args()
-    
-    extract_frames_from_videos(
+
+    stats = extract_frames_from_videos(
         video_dir=args.video_dir,
         output_dir=args.output_dir,
-        frame_stride=args.stride
-    )
\ No newline at end of file
+        frame_stride=args.stride,
+        workers=args.workers,
+        chunk_frames=args.chunk_frames,
+        image_format=args.format,
+        quality=args.quality,
+        imgsz=args.imgsz,
+        writer_threads=args.writer_threads,
+        queue_size=args.queue_size,
+        sampling=args.sampling,
+        scene_threshold=args.scene_threshold,
+        min_gap=args.min_gap,
+        max_gap=args.max_gap,
+        use_manifest=not args.no_manifest,
+        force=args.force
+    )
+    if stats['videos_skipped']:
+        print(f"{stats['videos_skipped']} unchanged videos skipped")
+    if stats['frames_scanned'] and stats['seconds'] > 0:
+        print(f"{stats['frames_saved']} frames saved, {stats['frames_dropped']} near-duplicates dropped "
+              f"from {stats['videos']} videos ({stats['bytes_written'] / 1e6:.1f} MB), "
+              f"{stats['frames_scanned'] / stats['seconds']:.1f} frames/s")
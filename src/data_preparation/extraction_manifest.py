@@ -0,0 +1,112 @@
+import json
+import sqlite3
+import hashlib
+from pathlib import Path
+
+MANIFEST_NAME = ".extraction_manifest.sqlite"
+
+def file_digest(path: Path, block_size: int = 4 * 1024 * 1024) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def label_path_for(output_dir: Path, filename: str) -> Path:
+    return output_dir.parent / f"{output_dir.name}_labels" / f"{Path(filename).stem}.txt"
+
+class ExtractionManifest:
+    def __init__(self, path: Path):
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS videos (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                digest TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                total_frames INTEGER NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                video TEXT NOT NULL,
+                start_frame INTEGER NOT NULL,
+                PRIMARY KEY (video, start_frame)
+            );
+            CREATE TABLE IF NOT EXISTS frames (
+                video TEXT NOT NULL,
+                frame_index INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                PRIMARY KEY (video, frame_index)
+            );
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def prepare_video(self, video_path: Path, settings: dict, total_frames: int, output_dir: Path):
+        stat = video_path.stat()
+        settings_json = json.dumps(settings, sort_keys=True)
+        row = self.conn.execute(
+            "SELECT size, mtime, digest, settings, completed FROM videos WHERE name = ?",
+            (video_path.name,)
+        ).fetchone()
+
+        if row is not None and row[0] == stat.st_size and row[3] == settings_json:
+            if row[1] == stat.st_mtime:
+                return bool(row[4]), self.done_chunks(video_path)
+            if row[2] == file_digest(video_path):
+                with self.conn:
+                    self.conn.execute("UPDATE videos SET mtime = ? WHERE name = ?", (stat.st_mtime, video_path.name))
+                return bool(row[4]), self.done_chunks(video_path)
+
+        self.forget_video(video_path, output_dir)
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO videos (name, size, mtime, digest, settings, total_frames) VALUES (?, ?, ?, ?, ?, ?)",
+                (video_path.name, stat.st_size, stat.st_mtime, file_digest(video_path), settings_json, total_frames)
+            )
+        return False, set()
+
+    def done_chunks(self, video_path: Path):
+        rows = self.conn.execute("SELECT start_frame FROM chunks WHERE video = ?", (video_path.name,))
+        return {start_frame for (start_frame,) in rows}
+
+    def forget_video(self, video_path: Path, output_dir: Path):
+        rows = self.conn.execute("SELECT filename FROM frames WHERE video = ?", (video_path.name,)).fetchall()
+        labelled = 0
+        for (filename,) in rows:
+            if label_path_for(output_dir, filename).exists():
+                labelled += 1
+                continue
+            (output_dir / filename).unlink(missing_ok=True)
+        if labelled:
+            print(f"warning: keeping {labelled} labelled frames of {video_path.name} in {output_dir}; "
+                  f"frames extracted again under the same name replace their images, check those labels")
+        with self.conn:
+            self.conn.execute("DELETE FROM frames WHERE video = ?", (video_path.name,))
+            self.conn.execute("DELETE FROM chunks WHERE video = ?", (video_path.name,))
+            self.conn.execute("DELETE FROM videos WHERE name = ?", (video_path.name,))
+
+    def record_chunk(self, video_path: Path, start_frame: int, frames):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO frames (video, frame_index, filename) VALUES (?, ?, ?)",
+                [(video_path.name, frame_index, filename) for frame_index, filename in frames]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO chunks (video, start_frame) VALUES (?, ?)",
+                (video_path.name, start_frame)
+            )
+
+    def mark_completed(self, video_path: Path):
+        with self.conn:
+            self.conn.execute("UPDATE videos SET completed = 1 WHERE name = ?", (video_path.name,))
@@ -0,0 +1,76 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PLACEMENT_MODES = ['link', 'reflink', 'symlink', 'copy']
+FICLONE = 0x40049409
+
+def is_same_file(source: Path, destination: Path) -> bool:
+    try:
+        destination_stat = destination.stat()
+    except FileNotFoundError:
+        return False
+    source_stat = source.stat()
+    if os.path.samestat(source_stat, destination_stat):
+        return True
+    return (destination_stat.st_size == source_stat.st_size
+            and int(destination_stat.st_mtime) == int(source_stat.st_mtime))
+
+def copy_data(source: Path, destination: Path):
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(source, 'rb') as src, open(destination, 'wb') as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                shutil.copystat(source, destination)
+                return
+        except OSError:
+            pass
+    shutil.copy2(source, destination)
+
+def reflink(source: Path, destination: Path):
+    try:
+        import fcntl
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, destination)
+    except (ImportError, OSError):
+        copy_data(source, destination)
+
+def place_file(source: Path, destination: Path, mode: str = 'link') -> bool:
+    if is_same_file(source, destination):
+        return False
+
+    temporary = destination.with_name(f".{destination.name}.tmp")
+    temporary.unlink(missing_ok=True)
+    if mode == 'link':
+        try:
+            os.link(source, temporary)
+        except OSError:
+            copy_data(source, temporary)
+    elif mode == 'symlink':
+        os.symlink(source.resolve(), temporary)
+    elif mode == 'reflink':
+        reflink(source, temporary)
+    elif mode == 'copy':
+        copy_data(source, temporary)
+    else:
+        raise ValueError(f"Unknown placement mode: {mode}")
+
+    os.replace(temporary, destination)
+    return True
+
+def place_files(pairs, mode: str = 'link', workers: int = 8, progress=None):
+    placed = 0
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        for changed in pool.map(lambda pair: place_file(pair[0], pair[1], mode), pairs):
+            placed += changed
+            if progress is not None:
+                progress.update(1)
+    return placed
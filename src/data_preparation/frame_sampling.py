@@ -0,0 +1,36 @@
+import cv2
+import numpy as np
+
+SAMPLING_MODES = ['stride', 'scene']
+
+def dhash(image, hash_size: int = 8):
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+def hamming_distance(a, b) -> int:
+    return int(np.unpackbits(np.bitwise_xor(a, b)).sum())
+
+class SceneChangeSampler:
+    def __init__(self, threshold: int = 10, min_gap: int = 15, max_gap: int = 600, hash_size: int = 8):
+        self.threshold = threshold
+        self.min_gap = max(min_gap, 1)
+        self.max_gap = max(max_gap, self.min_gap)
+        self.hash_size = hash_size
+        self.last_hash = None
+        self.last_index = None
+        self.dropped = 0
+
+    def keep(self, frame_index: int, frame) -> bool:
+        return self.keep_hash(frame_index, dhash(frame, self.hash_size))
+
+    def keep_hash(self, frame_index: int, frame_hash) -> bool:
+        if (self.last_hash is not None
+                and frame_index - self.last_index < self.max_gap
+                and hamming_distance(frame_hash, self.last_hash) < self.threshold):
+            self.dropped += 1
+            return False
+
+        self.last_hash = frame_hash
+        self.last_index = frame_index
+        return True
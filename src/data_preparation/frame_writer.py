@@ -0,0 +1,80 @@
+import cv2
+import queue
+import threading
+from pathlib import Path
+
+IMAGE_FORMATS = ['jpg', 'webp', 'png']
+
+def encode_params(image_format: str, quality: int):
+    if image_format == 'jpg':
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if image_format == 'webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    if image_format == 'png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, 3]
+    raise ValueError(f"Unsupported image format: {image_format}")
+
+def resize_to_imgsz(frame, imgsz: int):
+    h, w = frame.shape[:2]
+    scale = imgsz / max(h, w)
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+class FrameWriter:
+    def __init__(self, image_format='jpg', quality=95, imgsz=None, threads=2, queue_size=8):
+        self.extension = f".{image_format}"
+        self.params = encode_params(image_format, quality)
+        self.imgsz = imgsz
+        self.queue = queue.Queue(maxsize=max(queue_size, 1))
+        self.lock = threading.Lock()
+        self.error = None
+        self.frames_written = 0
+        self.bytes_written = 0
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(max(threads, 1))]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, path: Path, frame):
+        if self.error is not None:
+            raise self.error
+        self.queue.put((path, frame))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+
+            path, frame = item
+            try:
+                if self.imgsz:
+                    frame = resize_to_imgsz(frame, self.imgsz)
+                ok, buffer = cv2.imencode(self.extension, frame, self.params)
+                if not ok:
+                    raise RuntimeError(f"Failed to encode {path}")
+                with open(path, 'wb') as f:
+                    f.write(buffer.tobytes())
+                with self.lock:
+                    self.frames_written += 1
+                    self.bytes_written += buffer.size
+            except Exception as e:
+                with self.lock:
+                    if self.error is None:
+                        self.error = e
+
+    def close(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
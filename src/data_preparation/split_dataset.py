@@ -1,45 +1,157 @@
-import random
-import shutil
+import sys
+import argparse
 from pathlib import Path
 from tqdm import tqdm
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from data_preparation.file_placement import place_files, PLACEMENT_MODES
+from data_preparation.split_engine import (plan_split, group_of, load_split_manifest, save_split_manifest,
+                                           SPLIT_NAMES, SPLIT_MANIFEST_NAME, FRAME_GROUP_PATTERN)
+from common.instrumentation import span, install
+from common.yolo_labels import load_class_names
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+IMAGE_EXTENSIONS = ['.jpg', '.webp', '.png']
+
+def find_image(images_source: Path, stem: str):
+    for extension in IMAGE_EXTENSIONS:
+        image_path = images_source / f"{stem}{extension}"
+        if image_path.exists():
+            return image_path
+    return None
+
+def remove_stale_files(directory: Path, keep_stems: set, extensions):
+    removed = 0
+    for path in directory.iterdir():
+        if path.suffix.lower() in extensions and path.stem not in keep_stems:
+            path.unlink()
+            removed += 1
+    return removed
+
+def print_split_summary(plan: dict, file_counts: dict, class_names):
+    print(f"{'split':<6} {'groups':>6} {'frames':>7} " + " ".join(f"{name:>12}" for name in class_names))
+    for split_name in SPLIT_NAMES:
+        stems = [stem for stem, s in plan['files'].items() if s == split_name and stem in file_counts]
+        groups = {group_of(stem, plan['group_pattern']) for stem in stems}
+        totals = [sum(file_counts[stem][d] for stem in stems) for d in range(len(class_names) + 1)]
+        print(f"{split_name:<6} {len(groups):>6} {totals[0]:>7} " + " ".join(f"{n:>12}" for n in totals[1:]))
+
 def split_annotated_dataset(
     images_source: Path,
     labels_source: Path,
     output_dir: Path,
-    split_ratios=(0.7, 0.2, 0.1)
+    split_ratios=(0.7, 0.2, 0.1),
+    mode: str = 'link',
+    workers: int = 8,
+    seed: int = 0,
+    class_names=None,
+    group_pattern: str = FRAME_GROUP_PATTERN,
+    reshuffle: bool = False
 ):
-    label_files = list(labels_source.glob("*.txt"))
-        
-    random.shuffle(label_files)
-    
-    total = len(label_files)
-    train_end = int(total * split_ratios[0])
-    val_end = train_end + int(total * split_ratios[1])
-    
-    splits = {
-        "train": label_files[:train_end],
-        "val": label_files[train_end:val_end],
-        "test": label_files[val_end:]
-    }
-    
-    for split_name, files in splits.items():
+    class_names = class_names or load_class_names(PROJECT_ROOT / "classes.txt")
+    label_files = [p for p in labels_source.glob("*.txt") if find_image(images_source, p.stem) is not None]
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / SPLIT_MANIFEST_NAME
+    manifest = {} if reshuffle else load_split_manifest(manifest_path)
+    with span('split.plan') as trace:
+        plan, file_counts = plan_split(label_files, len(class_names), split_ratios, seed, manifest, group_pattern)
+        trace.add('label_files', len(label_files))
+
+    for split_name in SPLIT_NAMES:
         img_dir = output_dir / "images" / split_name
         lbl_dir = output_dir / "labels" / split_name
         img_dir.mkdir(parents=True, exist_ok=True)
         lbl_dir.mkdir(parents=True, exist_ok=True)
-        
-        for label_path in tqdm(files, desc=f"Processing '{split_name}' split", unit="file"):
-            image_path = images_source / f"{label_path.stem}.jpg"
-            if image_path.exists():
-                shutil.copy(image_path, img_dir)
-                shutil.copy(label_path, lbl_dir)
+
+        files = [p for p in sorted(label_files) if plan['files'].get(p.stem) == split_name]
+        keep_stems = {p.stem for p in files}
+        remove_stale_files(img_dir, keep_stems, IMAGE_EXTENSIONS)
+        remove_stale_files(lbl_dir, keep_stems, ['.txt'])
+
+        pairs = []
+        for label_path in files:
+            image_path = find_image(images_source, label_path.stem)
+            if image_path is not None:
+                pairs.append((image_path, img_dir / image_path.name))
+                pairs.append((label_path, lbl_dir / label_path.name))
+
+        with span('split.place', split=split_name, mode=mode) as trace, \
+                tqdm(total=len(pairs), desc=f"Processing '{split_name}' split", unit="file") as pbar:
+            place_files(pairs, mode=mode, workers=workers, progress=pbar)
+            trace.add('files', len(pairs))
+
+    save_split_manifest(manifest_path, plan)
+    print_split_summary(plan, file_counts, class_names)
+    return plan
 
 if __name__ == "__main__":
-    PROJECT_ROOT = Path(__file__).resolve().parents[2]
-    
-    IMAGES_DIR = PROJECT_ROOT / "data/extracted_frames"
-    LABELS_DIR = PROJECT_ROOT / "data/extracted_frames_labels"
-    PROCESSED_DIR = PROJECT_ROOT / "data/processed"
-    
-    split_annotated_dataset(IMAGES_DIR, LABELS_DIR, PROCESSED_DIR)
\ No newline at end of file
+    install('split_dataset')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--images",
+        type=Path,
+        default=PROJECT_ROOT / "data/extracted_frames"
+    )
+    parser.add_argument(
+        "--labels",
+        type=Path,
+        default=PROJECT_ROOT / "data/extracted_frames_labels"
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=PROJECT_ROOT / "data/processed"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=PLACEMENT_MODES,
+        default="link"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8
+    )
+    parser.add_argument(
+        "--ratios",
+        type=float,
+        nargs=3,
+        default=[0.7, 0.2, 0.1]
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0
+    )
+    parser.add_argument(
+        "--classes",
+        type=Path,
+        default=PROJECT_ROOT / "classes.txt"
+    )
+    parser.add_argument(
+        "--group-pattern",
+        default=FRAME_GROUP_PATTERN
+    )
+    parser.add_argument(
+        "--reshuffle",
+        action="store_true"
+    )
+
+    args = parser.parse_args()
+
+    split_annotated_dataset(
+        images_source=args.images,
+        labels_source=args.labels,
+        output_dir=args.output_dir,
+        split_ratios=tuple(args.ratios),
+        mode=args.mode,
+        workers=args.workers,
+        seed=args.seed,
+        class_names=load_class_names(args.classes),
+        group_pattern=args.group_pattern,
+        reshuffle=args.reshuffle
+    )
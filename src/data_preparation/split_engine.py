@@ -0,0 +1,105 @@
+import os
+import re
+import json
+import random
+from pathlib import Path
+
+from common.yolo_labels import load_label_dir
+
+SPLIT_NAMES = ['train', 'val', 'test']
+SPLIT_MANIFEST_NAME = "split_manifest.json"
+FRAME_GROUP_PATTERN = r"^(?P<group>.+)_frame_\d+$"
+
+def group_of(stem: str, group_pattern: str = FRAME_GROUP_PATTERN) -> str:
+    match = re.match(group_pattern, stem)
+    return match.group('group') if match else stem
+
+def load_split_manifest(path: Path):
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_split_manifest(path: Path, manifest: dict):
+    temporary = path.with_name(f".{path.name}.tmp")
+    with open(temporary, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporary, path)
+
+def assign_groups(
+    group_counts: dict,
+    split_ratios,
+    seed: int = 0,
+    fixed_groups: dict = None
+):
+    fixed_groups = {g: s for g, s in (fixed_groups or {}).items() if g in group_counts and s in SPLIT_NAMES}
+    ratios = dict(zip(SPLIT_NAMES, split_ratios))
+    dims = len(next(iter(group_counts.values()), []))
+    totals = [sum(counts[d] for counts in group_counts.values()) for d in range(dims)]
+    loads = {split: [0] * dims for split in SPLIT_NAMES}
+    for group, split in fixed_groups.items():
+        loads[split] = [a + b for a, b in zip(loads[split], group_counts[group])]
+
+    rng = random.Random(seed)
+    pending = sorted(g for g in group_counts if g not in fixed_groups)
+    rng.shuffle(pending)
+    pending.sort(key=lambda g: -group_counts[g][0])
+
+    def deficit(split, counts):
+        return sum(
+            (ratios[split] * totals[d] - loads[split][d]) / totals[d] * counts[d]
+            for d in range(dims) if totals[d] and counts[d]
+        )
+
+    assignment = dict(fixed_groups)
+    for group in pending:
+        counts = group_counts[group]
+        split = max(SPLIT_NAMES, key=lambda s: (deficit(s, counts), ratios[s]))
+        assignment[group] = split
+        loads[split] = [a + b for a, b in zip(loads[split], counts)]
+
+    return assignment
+
+def plan_split(
+    label_files,
+    num_classes: int,
+    split_ratios=(0.7, 0.2, 0.1),
+    seed: int = 0,
+    manifest: dict = None,
+    group_pattern: str = FRAME_GROUP_PATTERN
+):
+    manifest = manifest or {}
+    if manifest.get('seed', seed) != seed or manifest.get('ratios', list(split_ratios)) != list(split_ratios):
+        raise ValueError(f"Split manifest was created with seed={manifest.get('seed')} "
+                         f"ratios={manifest.get('ratios')}; use the same --seed and --ratios or --reshuffle")
+    label_files = sorted(label_files)
+    class_counts = {}
+    for directory in {p.parent for p in label_files}:
+        labels = load_label_dir(directory, num_classes)
+        class_counts[directory] = (labels.positions, labels.class_counts(num_classes))
+    group_counts = {}
+    file_counts = {}
+    stems_by_group = {}
+    for label_path in label_files:
+        group = group_of(label_path.stem, group_pattern)
+        positions, counts_matrix = class_counts[label_path.parent]
+        counts = counts_matrix[positions[label_path.stem]].tolist()
+        file_counts[label_path.stem] = [1] + counts
+        previous = group_counts.get(group, [0] * (num_classes + 1))
+        group_counts[group] = [previous[0] + 1] + [a + b for a, b in zip(previous[1:], counts)]
+        stems_by_group.setdefault(group, []).append(label_path.stem)
+
+    groups = assign_groups(group_counts, split_ratios, seed, manifest.get('groups'))
+    overrides = manifest.get('overrides', {})
+    excluded = set(manifest.get('excluded', []))
+    files = {stem: overrides.get(stem, groups[group]) for group, stems in stems_by_group.items() for stem in stems
+             if stem not in excluded}
+    return {
+        'seed': seed,
+        'ratios': list(split_ratios),
+        'group_pattern': group_pattern,
+        'groups': {**manifest.get('groups', {}), **groups},
+        'overrides': overrides,
+        'excluded': sorted(excluded),
+        'files': files
+    }, file_counts
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+BACKENDS = ['pytorch', 'onnx', 'onnx-int8', 'openvino', 'openvino-int8']
+
+def artifact_path(weights_path: Path, backend: str) -> Path:
+    if backend == 'pytorch':
+        return weights_path
+    if backend == 'onnx':
+        return weights_path.with_suffix('.onnx')
+    if backend == 'onnx-int8':
+        return weights_path.with_name(f"{weights_path.stem}_int8.onnx")
+    if backend == 'openvino':
+        return weights_path.with_name(f"{weights_path.stem}_openvino_model")
+    if backend == 'openvino-int8':
+        return weights_path.with_name(f"{weights_path.stem}_int8_openvino_model")
+    raise ValueError(f"Unknown backend: {backend}")
+
+def load_model(weights_path: Path, backend: str = 'pytorch'):
+    from ultralytics import YOLO
+
+    path = artifact_path(weights_path, backend)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"{path} not found, export it first: python src/evaluation/export_model.py --formats {backend}"
+        )
+    return YOLO(str(path), task='detect')
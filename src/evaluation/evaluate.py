@@ -0,0 +1,268 @@
+import os
+import sys
+import csv
+import json
+import time
+import yaml
+import shutil
+import argparse
+import numpy as np
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from data_preparation.split_engine import group_of
+from evaluation.backends import BACKENDS, load_model
+from evaluation.prediction_cache import cached_predictions
+from evaluation.metrics import (evaluate_detections, pr_curves, confusion_matrix, image_errors, filter_by_size,
+                                SIZE_BUCKETS)
+from common.instrumentation import span, install
+from common.yolo_labels import load_label_dir
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+IMAGE_EXTENSIONS = ['.jpg', '.webp', '.png']
+REVIEW_SOURCES_NAME = "review_sources.json"
+
+def split_dirs(data_config_path: Path, split: str = 'test'):
+    with open(data_config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    images_dir = Path(config['path']) / config[split]
+    labels_dir = Path(f"{os.sep}labels{os.sep}".join(f"{images_dir}{os.sep}".rsplit(f"{os.sep}images{os.sep}", 1)))
+    names = config['names']
+    names = [names[i] for i in sorted(names)] if isinstance(names, dict) else list(names)
+    return images_dir, labels_dir, names
+
+def build_records(cache, image_files, labels_dir: Path, num_classes: int = None):
+    labels = load_label_dir(labels_dir, num_classes)
+    records = []
+    for image_path in image_files:
+        (height, width), boxes, conf, cls = cache.get(image_path.stem)
+        gt_boxes, gt_cls = labels.boxes(image_path.stem, width, height)
+        records.append((boxes, conf, cls, gt_boxes, gt_cls))
+    return records
+
+def score(records, stems, num_classes: int, conf: float, iou: float):
+    kept = [(b[c >= conf], c[c >= conf], k[c >= conf], gb, gc) for b, c, k, gb, gc in records]
+    summary = evaluate_detections(records, num_classes)
+    summary['confusion'] = confusion_matrix(records, num_classes, conf, iou)
+
+    videos = {}
+    for stem, record in zip(stems, records):
+        videos.setdefault(group_of(stem), []).append(record)
+    summary['videos'] = {video: evaluate_detections(rs, num_classes) for video, rs in sorted(videos.items())}
+    summary['sizes'] = {}
+    for name, (low, high) in SIZE_BUCKETS.items():
+        bucket = filter_by_size(records, low, high)
+        if any(len(gt_cls) for *_, gt_cls in bucket):
+            summary['sizes'][name] = evaluate_detections(bucket, num_classes)
+
+    errors = [image_errors(*record, conf_threshold=conf, iou_threshold=iou) for record in kept]
+    summary['false_positives'] = int(sum(fp.sum() for fp, _ in errors))
+    summary['false_negatives'] = int(sum(fn.sum() for _, fn in errors))
+    return summary, kept, errors
+
+def print_summary(summary: dict, names):
+    print(f"mAP50 {summary['map50']:.3f}  mAP50-95 {summary['map50_95']:.3f}  "
+          f"FP {summary['false_positives']}  FN {summary['false_negatives']}")
+
+    print(f"\n{'class':<14} {'AP50':>6} {'AP50-95':>8}")
+    for class_id, name in enumerate(names):
+        print(f"{name:<14} {summary['ap'][class_id, 0]:>6.3f} {summary['ap'][class_id].mean():>8.3f}")
+
+    labels = names + ['background']
+    print("\nconfusion (rows: predicted, columns: true)")
+    print(f"{'':<14} " + " ".join(f"{name[:10]:>10}" for name in labels))
+    for i, row in enumerate(summary['confusion']):
+        print(f"{labels[i]:<14} " + " ".join(f"{n:>10}" for n in row))
+
+    for title, breakdown in (('video', summary['videos']), ('size', summary['sizes'])):
+        print(f"\n{title:<20} {'mAP50':>7} {'mAP50-95':>9}")
+        for key, metrics in breakdown.items():
+            print(f"{key:<20} {metrics['map50']:>7.3f} {metrics['map50_95']:>9.3f}")
+
+def save_pr_curves(records, names, path: Path):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    figure, axis = plt.subplots(figsize=(8, 6))
+    for name, (recall, precision, _) in zip(names, pr_curves(records, len(names))):
+        envelope = np.flip(np.maximum.accumulate(np.flip(precision))) if len(precision) else precision
+        axis.plot(recall, envelope, label=name)
+    axis.set_xlabel('recall')
+    axis.set_ylabel('precision')
+    axis.set_xlim(0, 1)
+    axis.set_ylim(0, 1.05)
+    axis.legend()
+    figure.savefig(path, dpi=120, bbox_inches='tight')
+    plt.close(figure)
+
+def export_review(kept, errors, image_files, labels_dir: Path, output_dir: Path, names, top: int):
+    review_dir = output_dir / "review"
+    review_labels_dir = output_dir / "review_labels"
+    for directory in (review_dir, review_labels_dir):
+        if directory.exists():
+            shutil.rmtree(directory)
+        directory.mkdir(parents=True)
+
+    scores = [float(conf[fp].sum()) + int(fn.sum()) for (_, conf, _, _, _), (fp, fn) in zip(kept, errors)]
+    worst = [i for i in np.argsort(scores)[::-1][:top] if scores[i] > 0]
+    sources = {}
+    with open(output_dir / "review.csv", 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['image', 'error', 'class', 'confidence', 'x1', 'y1', 'x2', 'y2'])
+        for i in worst:
+            image_path = image_files[i]
+            shutil.copy2(image_path, review_dir / image_path.name)
+            label_path = labels_dir / f"{image_path.stem}.txt"
+            exported = None
+            if label_path.exists():
+                shutil.copy2(label_path, review_labels_dir / label_path.name)
+                exported = label_path.read_text()
+            sources[label_path.name] = {'label': str(label_path.absolute()), 'exported': exported}
+
+            boxes, conf, cls, gt_boxes, gt_cls = kept[i]
+            fp, fn = errors[i]
+            for j in np.flatnonzero(fp):
+                writer.writerow([image_path.name, 'FP', names[int(cls[j])], f"{conf[j]:.3f}",
+                                 *(f"{v:.1f}" for v in boxes[j])])
+            for j in np.flatnonzero(fn):
+                writer.writerow([image_path.name, 'FN', names[int(gt_cls[j])], '', *(f"{v:.1f}" for v in gt_boxes[j])])
+    with open(output_dir / REVIEW_SOURCES_NAME, 'w') as f:
+        json.dump(sources, f, indent=2)
+    return review_dir, len(worst)
+
+def sync_review_labels(output_dir: Path):
+    sources_path = output_dir / REVIEW_SOURCES_NAME
+    if not sources_path.exists():
+        return 0
+    with open(sources_path, 'r') as f:
+        sources = json.load(f)
+
+    synced = 0
+    for name, source in sources.items():
+        review_label = output_dir / "review_labels" / name
+        if not review_label.exists():
+            continue
+        text = review_label.read_text()
+        if text == source['exported']:
+            continue
+        with open(source['label'], 'w') as f:
+            f.write(text)
+        source['exported'] = text
+        synced += 1
+
+    with open(sources_path, 'w') as f:
+        json.dump(sources, f, indent=2)
+    if synced:
+        print(f"{synced} reviewed labels copied back from {output_dir / 'review_labels'}")
+    return synced
+
+def run_evaluation(
+    weights_path: Path,
+    data_config_path: Path,
+    split: str = 'test',
+    backend: str = 'pytorch',
+    conf: float = 0.25,
+    iou: float = 0.5,
+    review: int = 50,
+    output_dir: Path = None,
+    sync_only: bool = False
+):
+    images_dir, labels_dir, names = split_dirs(data_config_path, split)
+    image_files = sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    output_dir = output_dir or PROJECT_ROOT / "runs/eval" / weights_path.parents[1].name / split
+    output_dir.mkdir(parents=True, exist_ok=True)
+    sync_review_labels(output_dir)
+    if sync_only:
+        return None
+
+    model = load_model(weights_path, backend)
+    cache = cached_predictions(model, weights_path, backend, image_files)
+    records = build_records(cache, image_files, labels_dir, len(names))
+
+    started = time.perf_counter()
+    with span('evaluate.score', images=len(records)):
+        summary, kept, errors = score(records, [p.stem for p in image_files], len(names), conf, iou)
+    print(f"Scored {len(records)} cached images in {(time.perf_counter() - started) * 1000:.0f} ms\n")
+    print_summary(summary, names)
+
+    save_pr_curves(records, names, output_dir / "pr_curves.png")
+    with open(output_dir / "summary.json", 'w') as f:
+        json.dump({
+            'map50': summary['map50'],
+            'map50_95': summary['map50_95'],
+            'ap50': dict(zip(names, summary['ap'][:, 0].tolist())),
+            'confusion': summary['confusion'].tolist(),
+            'videos': {k: {'map50': v['map50'], 'map50_95': v['map50_95']} for k, v in summary['videos'].items()},
+            'sizes': {k: {'map50': v['map50'], 'map50_95': v['map50_95']} for k, v in summary['sizes'].items()}
+        }, f, indent=2)
+
+    if review > 0:
+        review_dir, exported = export_review(kept, errors, image_files, labels_dir, output_dir, names, review)
+        print(f"\n{exported} worst images exported for review: python src/annotation/annotator.py, open {review_dir}")
+    return summary
+
+if __name__ == '__main__':
+    install('evaluate')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--weights',
+        type=Path,
+        default=PROJECT_ROOT / "runs/detect/yolov11m_food_exp_hpo/weights/best.pt"
+    )
+    parser.add_argument(
+        '--data',
+        type=Path,
+        default=PROJECT_ROOT / "data/processed/dataset.yaml"
+    )
+    parser.add_argument(
+        '--split',
+        choices=['train', 'val', 'test'],
+        default='test'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=BACKENDS,
+        default='pytorch'
+    )
+    parser.add_argument(
+        '--conf',
+        type=float,
+        default=0.25
+    )
+    parser.add_argument(
+        '--iou',
+        type=float,
+        default=0.5
+    )
+    parser.add_argument(
+        '--review',
+        type=int,
+        default=50
+    )
+    parser.add_argument(
+        '--output-dir',
+        type=Path,
+        default=None
+    )
+    parser.add_argument(
+        '--sync-review',
+        action='store_true'
+    )
+
+    args = parser.parse_args()
+
+    run_evaluation(
+        weights_path=args.weights,
+        data_config_path=args.data,
+        split=args.split,
+        backend=args.backend,
+        conf=args.conf,
+        iou=args.iou,
+        review=args.review,
+        output_dir=args.output_dir,
+        sync_only=args.sync_review
+    )
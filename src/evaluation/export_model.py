@@ -0,0 +1,121 @@
+import cv2
+import sys
+import argparse
+import numpy as np
+from pathlib import Path
+from ultralytics import YOLO
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from evaluation.backends import BACKENDS, artifact_path
+from common.instrumentation import install
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+IMAGE_EXTENSIONS = ['.jpg', '.png', '.webp']
+
+def letterbox(image, imgsz: int):
+    h, w = image.shape[:2]
+    scale = imgsz / max(h, w)
+    resized = cv2.resize(image, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - resized.shape[0]) // 2
+    left = (imgsz - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return canvas
+
+def preprocess(image, imgsz: int):
+    tensor = letterbox(image, imgsz)[:, :, ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(tensor, dtype=np.float32)[None] / 255.0
+
+def quantize_onnx_int8(onnx_path: Path, output_path: Path, calibration_dir: Path, imgsz: int = 640, max_images: int = 200):
+    from onnxruntime import InferenceSession
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    input_name = InferenceSession(str(onnx_path), providers=['CPUExecutionProvider']).get_inputs()[0].name
+    images = sorted(p for p in calibration_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)[:max_images]
+    if not images:
+        raise FileNotFoundError(f"No calibration images in {calibration_dir}")
+
+    class ImageReader(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(images)
+
+        def get_next(self):
+            path = next(self.paths, None)
+            if path is None:
+                return None
+            return {input_name: preprocess(cv2.imread(str(path)), imgsz)}
+
+    quantize_static(
+        str(onnx_path),
+        str(output_path),
+        ImageReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+    return output_path
+
+def export_model(weights_path: Path, formats, data_config_path: Path, calibration_dir: Path, imgsz: int = 640):
+    model = YOLO(weights_path)
+    exported = {}
+    for backend in formats:
+        if backend == 'pytorch':
+            continue
+        if backend == 'onnx':
+            exported[backend] = Path(model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True))
+        elif backend == 'onnx-int8':
+            onnx_path = artifact_path(weights_path, 'onnx')
+            if not onnx_path.exists():
+                onnx_path = Path(model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True))
+            exported[backend] = quantize_onnx_int8(onnx_path, artifact_path(weights_path, backend), calibration_dir, imgsz)
+        elif backend == 'openvino':
+            exported[backend] = Path(model.export(format='openvino', imgsz=imgsz))
+        elif backend == 'openvino-int8':
+            exported[backend] = Path(model.export(format='openvino', imgsz=imgsz, int8=True, data=str(data_config_path)))
+    return exported
+
+if __name__ == '__main__':
+    install('export_model')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--weights',
+        type=Path,
+        default=PROJECT_ROOT / "runs/detect/yolov11m_food_exp_hpo/weights/best.pt"
+    )
+    parser.add_argument(
+        '--formats',
+        nargs='+',
+        choices=BACKENDS,
+        default=['onnx', 'onnx-int8', 'openvino', 'openvino-int8']
+    )
+    parser.add_argument(
+        '--data',
+        type=Path,
+        default=PROJECT_ROOT / "data/processed/dataset.yaml"
+    )
+    parser.add_argument(
+        '--calibration-dir',
+        type=Path,
+        default=PROJECT_ROOT / "data/processed/images/val"
+    )
+    parser.add_argument(
+        '--imgsz',
+        type=int,
+        default=640
+    )
+
+    args = parser.parse_args()
+
+    exported = export_model(
+        weights_path=args.weights,
+        formats=args.formats,
+        data_config_path=args.data,
+        calibration_dir=args.calibration_dir,
+        imgsz=args.imgsz
+    )
+    for backend, path in exported.items():
+        print(f"{backend:<14} {path}")
@@ -0,0 +1,49 @@
+import json
+import time
+import argparse
+import itertools
+import urllib.request
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+IMAGE_EXTENSIONS = ['.jpg', '.png', '.webp']
+
+def post_image(url: str, payload: bytes):
+    started = time.perf_counter()
+    request = urllib.request.Request(url, data=payload, method='POST', headers={'Content-Type': 'application/octet-stream'})
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - started
+
+def run_load_test(url: str, images_dir: Path, requests: int, concurrency: int):
+    payloads = [p.read_bytes() for p in sorted(images_dir.iterdir()) if p.suffix.lower() in IMAGE_EXTENSIONS]
+    if not payloads:
+        raise FileNotFoundError(f"No images in {images_dir}")
+
+    replay = list(itertools.islice(itertools.cycle(payloads), requests))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(lambda payload: post_image(f"{url}/predict", payload), replay))) * 1000
+    elapsed = time.perf_counter() - started
+
+    with urllib.request.urlopen(f"{url}/metrics") as response:
+        server_metrics = json.loads(response.read())
+
+    print(f"{requests} requests, concurrency {concurrency}: {requests / elapsed:.1f} req/s")
+    print(f"client latency p50 {np.percentile(latencies, 50):.1f} ms, p99 {np.percentile(latencies, 99):.1f} ms")
+    print(f"server: {json.dumps(server_metrics)}")
+    return latencies, server_metrics
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--images', type=Path, default=PROJECT_ROOT / "data/processed/images/test")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+
+    args = parser.parse_args()
+
+    run_load_test(args.url, args.images, args.requests, args.concurrency)
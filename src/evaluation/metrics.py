@@ -0,0 +1,164 @@
+import numpy as np
+
+from common.yolo_labels import read_label_file, to_xyxy
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+SIZE_BUCKETS = {'small': (0, 32 ** 2), 'medium': (32 ** 2, 96 ** 2), 'large': (96 ** 2, float('inf'))}
+
+def box_iou(boxes_a, boxes_b):
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (boxes_a[:, 2:] - boxes_a[:, :2]).prod(axis=1)
+    area_b = (boxes_b[:, 2:] - boxes_b[:, :2]).prod(axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+def greedy_pairs(iou, threshold: float):
+    gt_index, pred_index = np.nonzero(iou >= threshold)
+    if len(gt_index) == 0:
+        return gt_index, pred_index
+    order = np.argsort(-iou[gt_index, pred_index], kind='stable')
+    gt_index, pred_index = gt_index[order], pred_index[order]
+    _, first = np.unique(pred_index, return_index=True)
+    gt_index, pred_index = gt_index[np.sort(first)], pred_index[np.sort(first)]
+    _, first = np.unique(gt_index, return_index=True)
+    return gt_index[first], pred_index[first]
+
+def class_aware_iou(pred_boxes, pred_classes, gt_boxes, gt_classes):
+    iou = box_iou(gt_boxes, pred_boxes)
+    return iou * (np.asarray(gt_classes)[:, None] == np.asarray(pred_classes)[None, :])
+
+def match_predictions(pred_boxes, pred_classes, gt_boxes, gt_classes, iou_thresholds=IOU_THRESHOLDS):
+    correct = np.zeros((len(pred_boxes), len(iou_thresholds)), dtype=bool)
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return correct
+
+    iou = class_aware_iou(pred_boxes, pred_classes, gt_boxes, gt_classes)
+    for t, threshold in enumerate(iou_thresholds):
+        _, pred_index = greedy_pairs(iou, threshold)
+        correct[pred_index, t] = True
+    return correct
+
+def average_precision(recall, precision):
+    envelope = np.flip(np.maximum.accumulate(np.flip(precision)))
+    points = np.linspace(0, 1, 101)
+    indices = np.searchsorted(recall, points, side='left')
+    values = np.where(indices < len(recall), envelope[np.minimum(indices, len(recall) - 1)], 0.0)
+    return float(values.mean())
+
+def ap_per_class(correct, confidences, pred_classes, gt_classes, num_classes: int):
+    order = np.argsort(-confidences, kind='stable')
+    correct, pred_classes = correct[order], pred_classes[order]
+    ap = np.zeros((num_classes, correct.shape[1]))
+    for class_id in range(num_classes):
+        mask = pred_classes == class_id
+        n_gt = int((gt_classes == class_id).sum())
+        if n_gt == 0 or not mask.any():
+            continue
+        tp = np.cumsum(correct[mask], axis=0)
+        fp = np.cumsum(~correct[mask], axis=0)
+        recall = tp / n_gt
+        precision = tp / (tp + fp)
+        for t in range(correct.shape[1]):
+            ap[class_id, t] = average_precision(recall[:, t], precision[:, t])
+    return ap
+
+def evaluate_detections(records, num_classes: int, iou_thresholds=IOU_THRESHOLDS):
+    correct, confidences, pred_classes, gt_classes = [], [], [], []
+    for pred_boxes, pred_conf, pred_cls, gt_boxes, gt_cls in records:
+        correct.append(match_predictions(pred_boxes, pred_cls, gt_boxes, gt_cls, iou_thresholds))
+        confidences.append(np.asarray(pred_conf, dtype=np.float32).reshape(-1))
+        pred_classes.append(np.asarray(pred_cls, dtype=np.int64).reshape(-1))
+        gt_classes.append(np.asarray(gt_cls, dtype=np.int64).reshape(-1))
+
+    if not records:
+        return {'map50': 0.0, 'map50_95': 0.0, 'ap': np.zeros((num_classes, len(iou_thresholds)))}
+
+    gt_classes = np.concatenate(gt_classes)
+    ap = ap_per_class(np.concatenate(correct), np.concatenate(confidences),
+                      np.concatenate(pred_classes), gt_classes, num_classes)
+    present = np.bincount(gt_classes, minlength=num_classes)[:num_classes] > 0
+    ap_present = ap[present] if present.any() else np.zeros((1, len(iou_thresholds)))
+    return {
+        'map50': float(ap_present[:, 0].mean()),
+        'map50_95': float(ap_present.mean()),
+        'ap': ap
+    }
+
+def read_yolo_boxes(label_path, width: int, height: int, num_classes: int = None):
+    rows, _ = read_label_file(label_path, num_classes)
+    return to_xyxy(rows, width, height), rows[:, 0].astype(np.int64)
+
+def matched_ground_truth(pred_boxes, pred_classes, gt_boxes, gt_classes, iou_threshold: float = 0.5):
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return np.zeros(len(gt_boxes), dtype=bool)
+    iou = class_aware_iou(pred_boxes, pred_classes, gt_boxes, gt_classes)
+    return iou.max(axis=1) >= iou_threshold
+
+def box_areas(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return (boxes[:, 2:] - boxes[:, :2]).prod(axis=1)
+
+def filter_by_size(records, low: float, high: float):
+    filtered = []
+    for pred_boxes, pred_conf, pred_cls, gt_boxes, gt_cls in records:
+        pred_area, gt_area = box_areas(pred_boxes), box_areas(gt_boxes)
+        pred_keep = (pred_area >= low) & (pred_area < high)
+        gt_keep = (gt_area >= low) & (gt_area < high)
+        filtered.append((np.asarray(pred_boxes).reshape(-1, 4)[pred_keep], np.asarray(pred_conf)[pred_keep],
+                         np.asarray(pred_cls)[pred_keep], np.asarray(gt_boxes).reshape(-1, 4)[gt_keep],
+                         np.asarray(gt_cls)[gt_keep]))
+    return filtered
+
+def pr_curves(records, num_classes: int, iou_threshold: float = 0.5):
+    correct, confidences, pred_classes, gt_classes = [], [], [], []
+    for pred_boxes, pred_conf, pred_cls, gt_boxes, gt_cls in records:
+        correct.append(match_predictions(pred_boxes, pred_cls, gt_boxes, gt_cls, [iou_threshold])[:, 0])
+        confidences.append(np.asarray(pred_conf, dtype=np.float32).reshape(-1))
+        pred_classes.append(np.asarray(pred_cls, dtype=np.int64).reshape(-1))
+        gt_classes.append(np.asarray(gt_cls, dtype=np.int64).reshape(-1))
+    if not records:
+        return [(np.zeros(0), np.zeros(0), np.zeros(0)) for _ in range(num_classes)]
+
+    correct, confidences = np.concatenate(correct), np.concatenate(confidences)
+    pred_classes, gt_classes = np.concatenate(pred_classes), np.concatenate(gt_classes)
+    order = np.argsort(-confidences, kind='stable')
+    correct, confidences, pred_classes = correct[order], confidences[order], pred_classes[order]
+
+    curves = []
+    for class_id in range(num_classes):
+        mask = pred_classes == class_id
+        n_gt = max(int((gt_classes == class_id).sum()), 1)
+        tp = np.cumsum(correct[mask])
+        fp = np.cumsum(~correct[mask])
+        curves.append((tp / n_gt, tp / np.maximum(tp + fp, 1), confidences[mask]))
+    return curves
+
+def confusion_matrix(records, num_classes: int, conf_threshold: float = 0.25, iou_threshold: float = 0.45):
+    matrix = np.zeros((num_classes + 1, num_classes + 1), dtype=np.int64)
+    for pred_boxes, pred_conf, pred_cls, gt_boxes, gt_cls in records:
+        keep = np.asarray(pred_conf) >= conf_threshold
+        pred_boxes = np.asarray(pred_boxes).reshape(-1, 4)[keep]
+        pred_cls = np.asarray(pred_cls, dtype=np.int64)[keep]
+        gt_cls = np.asarray(gt_cls, dtype=np.int64)
+        gt_index, pred_index = greedy_pairs(box_iou(gt_boxes, pred_boxes), iou_threshold)
+        np.add.at(matrix, (pred_cls[pred_index], gt_cls[gt_index]), 1)
+        np.add.at(matrix, (num_classes, np.delete(gt_cls, gt_index)), 1)
+        np.add.at(matrix, (np.delete(pred_cls, pred_index), num_classes), 1)
+    return matrix
+
+def image_errors(pred_boxes, pred_conf, pred_cls, gt_boxes, gt_cls, conf_threshold: float = 0.25,
+                 iou_threshold: float = 0.5):
+    keep = np.asarray(pred_conf) >= conf_threshold
+    false_positive = keep.copy()
+    false_negative = np.ones(len(gt_cls), dtype=bool)
+    if keep.any() and len(gt_cls):
+        iou = class_aware_iou(np.asarray(pred_boxes).reshape(-1, 4)[keep], np.asarray(pred_cls)[keep],
+                              gt_boxes, gt_cls)
+        gt_index, pred_index = greedy_pairs(iou, iou_threshold)
+        false_positive[np.flatnonzero(keep)[pred_index]] = False
+        false_negative[gt_index] = False
+    return false_positive, false_negative
@@ -1,41 +1,155 @@
+import cv2
+import sys
 import argparse
 from pathlib import Path
-from ultralytics import YOLO
 
-def run_prediction(weights_path: Path, source: Path, confidence_threshold: float):
-    model = YOLO(weights_path)
-    
-    model.predict(
-        source=str(source),
-        save=True,
-        imgsz=640,
-        conf=confidence_threshold
-    )
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from evaluation.backends import BACKENDS, load_model
+from evaluation.video_pipeline import VideoPipeline, TrackingVideoPipeline, is_video, print_pipeline_report
+from evaluation.sliced_inference import SlicedModel, MERGE_MODES
+from common.instrumentation import span, install
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+def run_prediction(
+    weights_path: Path,
+    source: Path,
+    confidence_threshold: float,
+    batch_size: int = 4,
+    output_dir: Path = PROJECT_ROOT / "runs/detect/stream",
+    detect_every: int = 1,
+    motion_threshold: float = None,
+    backend: str = 'pytorch',
+    sliced: bool = False,
+    sliced_options: dict = None
+):
+    model = load_model(weights_path, backend)
+    if sliced:
+        model = SlicedModel(model, **(sliced_options or {}))
+
+    if is_video(source):
+        if detect_every > 1 or motion_threshold is not None:
+            pipeline = TrackingVideoPipeline(model, imgsz=640, conf=confidence_threshold, batch_size=batch_size,
+                                             detect_every=detect_every, motion_threshold=motion_threshold)
+        else:
+            pipeline = VideoPipeline(model, imgsz=640, conf=confidence_threshold, batch_size=batch_size)
+        report = pipeline.run(source, output_dir / f"{source.stem}.mp4")
+        print_pipeline_report(report)
+        return report
+
+    if sliced:
+        images = sorted(source.iterdir()) if source.is_dir() else [source]
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for image_path in images:
+            image = cv2.imread(str(image_path))
+            if image is None:
+                continue
+            with span('predict.sliced_image') as trace:
+                result = model.predict([image], imgsz=640, conf=confidence_threshold)[0]
+                trace.add('images')
+            result.save(str(output_dir / image_path.name))
+        print(f"{model.tiles_per_frame():.1f} tiles per image, results in {output_dir}")
+        return
+
+    with span('predict.images', source=str(source)):
+        model.predict(
+            source=str(source),
+            save=True,
+            imgsz=640,
+            conf=confidence_threshold
+        )
 
 if __name__ == '__main__':
-    PROJECT_ROOT = Path(__file__).resolve().parents[2]
-    
+    install('predict')
+
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        '--weights', 
-        type=Path, 
+        '--weights',
+        type=Path,
         default=PROJECT_ROOT / "runs/detect/yolov11m_food_exp_hpo/weights/best.pt"
     )
     parser.add_argument(
-        '--source', 
-        type=Path, 
+        '--source',
+        type=Path,
         default=PROJECT_ROOT / "data/processed/images/test"
     )
     parser.add_argument(
-        '--conf', 
+        '--conf',
         type=float,
         default=0.5
     )
-    
+    parser.add_argument(
+        '--batch',
+        type=int,
+        default=4
+    )
+    parser.add_argument(
+        '--output-dir',
+        type=Path,
+        default=PROJECT_ROOT / "runs/detect/stream"
+    )
+    parser.add_argument(
+        '--detect-every',
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        '--motion-threshold',
+        type=float,
+        default=None
+    )
+    parser.add_argument(
+        '--backend',
+        choices=BACKENDS,
+        default='pytorch'
+    )
+    parser.add_argument(
+        '--sliced',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--tile',
+        type=int,
+        default=640
+    )
+    parser.add_argument(
+        '--overlap',
+        type=float,
+        default=0.2
+    )
+    parser.add_argument(
+        '--merge',
+        choices=MERGE_MODES,
+        default='nms'
+    )
+    parser.add_argument(
+        '--coarse',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--max-tiles',
+        type=int,
+        default=None
+    )
+
     args = parser.parse_args()
-    
+
     run_prediction(
-        weights_path=args.weights, 
+        weights_path=args.weights,
         source=args.source,
-        confidence_threshold=args.conf
-    )
\ No newline at end of file
+        confidence_threshold=args.conf,
+        batch_size=args.batch,
+        output_dir=args.output_dir,
+        detect_every=args.detect_every,
+        motion_threshold=args.motion_threshold,
+        backend=args.backend,
+        sliced=args.sliced,
+        sliced_options={
+            'tile': args.tile,
+            'overlap': args.overlap,
+            'merge': args.merge,
+            'coarse': args.coarse,
+            'max_tiles': args.max_tiles
+        }
+    )
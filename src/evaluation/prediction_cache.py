@@ -0,0 +1,85 @@
+import os
+import hashlib
+import numpy as np
+from pathlib import Path
+
+from evaluation.backends import artifact_path
+from common.instrumentation import span
+
+CACHE_ROOT = Path(__file__).resolve().parents[2] / "runs/eval_cache"
+
+def model_key(weights_path: Path, backend: str, imgsz: int, conf: float) -> str:
+    path = artifact_path(weights_path, backend)
+    files = sorted(p for p in path.rglob('*') if p.is_file()) if path.is_dir() else [path]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{backend}:{imgsz}:{conf}".encode())
+    for file in files:
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(4 * 1024 * 1024), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def image_signature(path: Path):
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+class PredictionCache:
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries = {}
+        if path.exists():
+            with np.load(path) as data:
+                offsets = data['offsets']
+                for i, stem in enumerate(data['stems']):
+                    start, end = offsets[i], offsets[i + 1]
+                    self.entries[str(stem)] = (
+                        tuple(data['signatures'][i]), tuple(data['sizes'][i]),
+                        data['boxes'][start:end], data['conf'][start:end], data['cls'][start:end]
+                    )
+
+    def missing(self, image_files):
+        return [p for p in image_files
+                if p.stem not in self.entries or self.entries[p.stem][0] != image_signature(p)]
+
+    def put(self, image_path: Path, size, boxes, conf, cls):
+        self.entries[image_path.stem] = (image_signature(image_path), tuple(size), np.asarray(boxes, np.float32),
+                                         np.asarray(conf, np.float32), np.asarray(cls, np.int64))
+
+    def get(self, stem: str):
+        _, size, boxes, conf, cls = self.entries[stem]
+        return size, boxes, conf, cls
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        stems = sorted(self.entries)
+        entries = [self.entries[stem] for stem in stems]
+        temporary = self.path.with_name(f".{self.path.stem}.tmp.npz")
+        np.savez(
+            temporary,
+            stems=np.array(stems),
+            signatures=np.array([e[0] for e in entries], dtype=np.int64).reshape(-1, 2),
+            sizes=np.array([e[1] for e in entries], dtype=np.int32).reshape(-1, 2),
+            offsets=np.cumsum([0] + [len(e[3]) for e in entries]).astype(np.int64),
+            boxes=np.concatenate([e[2].reshape(-1, 4) for e in entries]) if entries else np.zeros((0, 4), np.float32),
+            conf=np.concatenate([e[3] for e in entries]) if entries else np.zeros(0, np.float32),
+            cls=np.concatenate([e[4] for e in entries]) if entries else np.zeros(0, np.int64)
+        )
+        os.replace(temporary, self.path)
+
+def cached_predictions(model, weights_path: Path, backend: str, image_files, imgsz: int = 640, conf: float = 0.001,
+                       batch_size: int = 8):
+    cache = PredictionCache(CACHE_ROOT / f"{model_key(weights_path, backend, imgsz, conf)}.npz")
+    missing = cache.missing(image_files)
+    if missing:
+        print(f"Predicting {len(missing)} of {len(image_files)} images, the rest come from the cache")
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            with span('evaluate.predict_batch') as trace:
+                results = model.predict([str(p) for p in batch], imgsz=imgsz, conf=conf, verbose=False)
+                trace.add('images', len(batch))
+            for image_path, result in zip(batch, results):
+                boxes = result.boxes
+                cache.put(image_path, result.orig_shape, boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(),
+                          boxes.cls.cpu().numpy())
+        cache.save()
+    return cache
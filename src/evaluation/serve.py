@@ -0,0 +1,194 @@
+import cv2
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+from collections import deque
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from evaluation.backends import BACKENDS, load_model
+from common.instrumentation import span, install
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+class _Request:
+    def __init__(self, image):
+        self.image = image
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class BatchingPredictor:
+    def __init__(self, model, imgsz=640, conf=0.5, max_batch=8, max_wait_ms=10.0):
+        self.model = model
+        self.imgsz = imgsz
+        self.conf = conf
+        self.max_batch = max(max_batch, 1)
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=10000)
+        self.batch_sizes = deque(maxlen=10000)
+        self.requests = 0
+        self.failures = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.model.predict(np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8), imgsz=self.imgsz, verbose=False)
+        self.thread.start()
+
+    def predict(self, image):
+        request = _Request(image)
+        self.queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                with span('serve.batch') as trace:
+                    results = self.model.predict([r.image for r in batch], imgsz=self.imgsz, conf=self.conf,
+                                                 verbose=False)
+                    trace.add('requests', len(batch))
+                for request, result in zip(batch, results):
+                    request.result = self.to_detections(result)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finished = time.perf_counter()
+            with self.lock:
+                self.batch_sizes.append(len(batch))
+                for request in batch:
+                    self.requests += 1
+                    self.failures += request.error is not None
+                    self.latencies.append(finished - request.submitted)
+            for request in batch:
+                request.done.set()
+
+    def to_detections(self, result):
+        boxes = result.boxes
+        return [
+            {'class_id': int(c), 'name': result.names[int(c)], 'confidence': round(float(p), 4),
+             'box': [round(float(v), 1) for v in xyxy]}
+            for c, p, xyxy in zip(boxes.cls.tolist(), boxes.conf.tolist(), boxes.xyxy.tolist())
+        ]
+
+    def metrics(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            batch_sizes = np.array(self.batch_sizes)
+            requests, failures = self.requests, self.failures
+        return {
+            'queue_depth': self.queue.qsize(),
+            'requests': requests,
+            'failures': failures,
+            'latency_ms_p50': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            'latency_ms_p99': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            'mean_batch_size': float(batch_sizes.mean()) if len(batch_sizes) else 0.0
+        }
+
+def make_handler(predictor: BatchingPredictor):
+    class InferenceHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self.send_json(200, predictor.metrics())
+            elif self.path == '/health':
+                self.send_json(200, {'status': 'ok'})
+            else:
+                self.send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self.send_json(404, {'error': 'not found'})
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            image = cv2.imdecode(np.frombuffer(self.rfile.read(length), dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                self.send_json(400, {'error': 'body is not a decodable image'})
+                return
+            started = time.perf_counter()
+            try:
+                detections = predictor.predict(image)
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+                return
+            self.send_json(200, {'detections': detections, 'latency_ms': (time.perf_counter() - started) * 1000})
+
+        def log_message(self, format, *args):
+            pass
+
+    return InferenceHandler
+
+def serve(weights_path: Path, host: str, port: int, backend: str = 'pytorch', conf: float = 0.5,
+          max_batch: int = 8, max_wait_ms: float = 10.0):
+    model = load_model(weights_path, backend)
+    predictor = BatchingPredictor(model, imgsz=640, conf=conf, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    predictor.start()
+
+    server = ThreadingHTTPServer((host, port), make_handler(predictor))
+    print(f"Serving {weights_path.name} ({backend}) on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    install('serve')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--weights',
+        type=Path,
+        default=PROJECT_ROOT / "runs/detect/yolov11m_food_exp_hpo/weights/best.pt"
+    )
+    parser.add_argument('--backend', choices=BACKENDS, default='pytorch')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--conf', type=float, default=0.5)
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10.0)
+
+    args = parser.parse_args()
+
+    serve(
+        weights_path=args.weights,
+        host=args.host,
+        port=args.port,
+        backend=args.backend,
+        conf=args.conf,
+        max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms
+    )
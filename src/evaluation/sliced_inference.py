@@ -0,0 +1,181 @@
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from evaluation.metrics import box_iou
+
+MERGE_MODES = ['nms', 'wbf']
+
+def tile_starts(size: int, tile: int, stride: int):
+    if size <= tile:
+        return [0]
+    starts = list(range(0, size - tile, stride))
+    return starts + [size - tile]
+
+def make_tiles(width: int, height: int, tile: int = 640, overlap: float = 0.2):
+    stride = max(int(tile * (1 - overlap)), 1)
+    return [
+        (x, y, min(x + tile, width), min(y + tile, height))
+        for y in tile_starts(height, tile, stride)
+        for x in tile_starts(width, tile, stride)
+    ]
+
+def busy_tiles(tiles, coarse_boxes, max_tiles: int = None):
+    tiles = np.asarray(tiles, dtype=np.float32).reshape(-1, 4)
+    coarse_boxes = np.asarray(coarse_boxes, dtype=np.float32).reshape(-1, 4)
+    if len(coarse_boxes) == 0:
+        return []
+
+    top_left = np.maximum(tiles[:, None, :2], coarse_boxes[None, :, :2])
+    bottom_right = np.minimum(tiles[:, None, 2:], coarse_boxes[None, :, 2:])
+    overlap = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    hits = (overlap > 0).sum(axis=1)
+    order = [i for i in np.argsort(-hits, kind='stable') if hits[i] > 0]
+    if max_tiles is not None:
+        order = order[:max_tiles]
+    return [tuple(int(v) for v in tiles[i]) for i in sorted(order)]
+
+def spread_tiles(tiles, max_tiles: int):
+    if max_tiles is None or len(tiles) <= max_tiles:
+        return tiles
+    keep = np.unique(np.linspace(0, len(tiles) - 1, max(max_tiles, 1)).round().astype(np.int64))
+    return [tiles[i] for i in keep]
+
+def nms(boxes, scores, classes, iou_threshold: float = 0.5):
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while len(order):
+        best, order = order[0], order[1:]
+        keep.append(best)
+        if not len(order):
+            break
+        iou = box_iou(boxes[best], boxes[order])[0]
+        order = order[(iou < iou_threshold) | (classes[order] != classes[best])]
+    return np.array(keep, dtype=np.int64)
+
+def overlapping_pairs(boxes, iou_threshold: float):
+    order = np.argsort(boxes[:, 0], kind='stable')
+    starts = np.arange(1, len(boxes) + 1)
+    counts = np.maximum(np.searchsorted(boxes[order, 0], boxes[order, 2], side='left') - starts, 0)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    first = order[np.repeat(starts - 1, counts)]
+    second = order[np.repeat(starts, counts) + within]
+
+    a, b = boxes[first], boxes[second]
+    intersection = np.clip(np.minimum(a[:, 2:], b[:, 2:]) - np.maximum(a[:, :2], b[:, :2]), 0, None).prod(axis=1)
+    union = (a[:, 2:] - a[:, :2]).prod(axis=1) + (b[:, 2:] - b[:, :2]).prod(axis=1) - intersection
+    keep = intersection / (union + 1e-9) >= iou_threshold
+    return first[keep], second[keep]
+
+def fusion_clusters(boxes, iou_threshold: float):
+    labels = np.arange(len(boxes))
+    first, second = overlapping_pairs(boxes, iou_threshold)
+    if not len(first):
+        return labels
+
+    sources = np.concatenate([first, second])
+    targets = np.concatenate([second, first])
+    order = np.argsort(sources, kind='stable')
+    sources, targets = sources[order], targets[order]
+    bounds = np.searchsorted(sources, np.arange(len(boxes) + 1))
+    free = np.ones(len(boxes), dtype=bool)
+    for i in np.unique(sources):
+        if free[i]:
+            neighbours = targets[bounds[i]:bounds[i + 1]]
+            members = neighbours[free[neighbours]]
+            free[members] = False
+            free[i] = False
+            labels[members] = i
+    return labels
+
+def weighted_boxes_fusion(boxes, scores, classes, iou_threshold: float = 0.5):
+    fused_boxes, fused_scores, fused_classes = [], [], []
+    for class_id in np.unique(classes):
+        order = np.flatnonzero(classes == class_id)
+        order = order[np.argsort(-scores[order], kind='stable')]
+        _, cluster, count = np.unique(fusion_clusters(boxes[order], iou_threshold), return_inverse=True,
+                                      return_counts=True)
+        weights = scores[order]
+        weighted = np.zeros((len(count), 4), dtype=np.float64)
+        np.add.at(weighted, cluster, boxes[order] * weights[:, None])
+        total = np.bincount(cluster, weights=weights, minlength=len(count))
+        best = np.full(len(count), -np.inf)
+        np.maximum.at(best, cluster, weights)
+        fused_boxes.append(weighted / total[:, None])
+        fused_scores.append(best)
+        fused_classes.append(np.full(len(count), class_id))
+
+    return (np.concatenate(fused_boxes).astype(np.float32).reshape(-1, 4),
+            np.concatenate(fused_scores).astype(np.float32),
+            np.concatenate(fused_classes).astype(np.float32))
+
+def merge_detections(boxes, scores, classes, mode: str = 'nms', iou_threshold: float = 0.5):
+    if len(boxes) == 0:
+        return boxes.reshape(-1, 4), scores, classes
+    if mode == 'wbf':
+        return weighted_boxes_fusion(boxes, scores, classes, iou_threshold)
+    keep = nms(boxes, scores, classes, iou_threshold)
+    return boxes[keep], scores[keep], classes[keep]
+
+def _detections(result, offset=(0, 0)):
+    boxes = result.boxes
+    xyxy = boxes.xyxy.cpu().numpy().reshape(-1, 4)
+    xyxy[:, [0, 2]] += offset[0]
+    xyxy[:, [1, 3]] += offset[1]
+    return xyxy, boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy()
+
+class SlicedModel:
+    def __init__(self, model, tile=640, overlap=0.2, merge='nms', iou=0.5, coarse=False, coarse_conf=0.1,
+                 max_tiles=None):
+        self.model = model
+        self.names = model.names
+        self.tile = tile
+        self.overlap = overlap
+        self.merge = merge
+        self.iou = iou
+        self.coarse = coarse
+        self.coarse_conf = coarse_conf
+        self.max_tiles = max_tiles
+        self.tiles_run = 0
+        self.frames_run = 0
+
+    def frame_tiles(self, frame, full_result):
+        height, width = frame.shape[:2]
+        tiles = make_tiles(width, height, self.tile, self.overlap)
+        if self.coarse:
+            boxes = full_result.boxes
+            busy = boxes.xyxy.cpu().numpy()[boxes.conf.cpu().numpy() >= self.coarse_conf]
+            return busy_tiles(tiles, busy, self.max_tiles)
+        return spread_tiles(tiles, self.max_tiles)
+
+    def predict(self, frames, imgsz=640, conf=0.5, verbose=False, **kwargs):
+        frames = frames if isinstance(frames, list) else [frames]
+        first_pass_conf = min(conf, self.coarse_conf) if self.coarse else conf
+        full_results = self.model.predict(frames, imgsz=imgsz, conf=first_pass_conf, verbose=verbose, **kwargs)
+
+        crops, owners = [], []
+        for frame_id, (frame, full_result) in enumerate(zip(frames, full_results)):
+            for x0, y0, x1, y1 in self.frame_tiles(frame, full_result):
+                crops.append(frame[y0:y1, x0:x1])
+                owners.append((frame_id, (x0, y0)))
+        tile_results = self.model.predict(crops, imgsz=self.tile, conf=conf, verbose=verbose, **kwargs) if crops else []
+        self.tiles_run += len(crops)
+        self.frames_run += len(frames)
+
+        per_frame = [[_detections(result)] for result in full_results]
+        for (frame_id, offset), result in zip(owners, tile_results):
+            per_frame[frame_id].append(_detections(result, offset))
+
+        merged = []
+        for frame, full_result, parts in zip(frames, full_results, per_frame):
+            boxes = np.concatenate([p[0] for p in parts])
+            scores = np.concatenate([p[1] for p in parts])
+            classes = np.concatenate([p[2] for p in parts])
+            keep = scores >= conf
+            boxes, scores, classes = merge_detections(boxes[keep], scores[keep], classes[keep], self.merge, self.iou)
+            data = torch.from_numpy(np.concatenate([boxes, scores[:, None], classes[:, None]], axis=1))
+            merged.append(Results(frame, path=full_result.path, names=self.names, boxes=data))
+        return merged
+
+    def tiles_per_frame(self) -> float:
+        return self.tiles_run / self.frames_run if self.frames_run else 0.0
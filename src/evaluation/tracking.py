@@ -0,0 +1,90 @@
+import numpy as np
+
+from evaluation.metrics import box_iou
+
+def xyxy_to_cxcywh(box):
+    x1, y1, x2, y2 = box
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=np.float64)
+
+def cxcywh_to_xyxy(state):
+    cx, cy, w, h = state[:4]
+    return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], dtype=np.float32)
+
+class KalmanBoxTrack:
+    transition = np.eye(8) + np.eye(8, k=4)
+    observation = np.eye(4, 8)
+
+    def __init__(self, track_id: int, box, confidence: float, class_id: int):
+        self.id = track_id
+        self.confidence = confidence
+        self.class_id = class_id
+        self.state = np.zeros(8)
+        self.state[:4] = xyxy_to_cxcywh(box)
+        scale = max(self.state[2], self.state[3])
+        self.covariance = np.diag([scale, scale, scale, scale, 10 * scale, 10 * scale, 10 * scale, 10 * scale]) ** 2 / 100
+        self.misses = 0
+
+    def predict(self):
+        scale = max(self.state[2], self.state[3], 1.0)
+        process_noise = np.diag([0.05, 0.05, 0.05, 0.05, 0.01, 0.01, 0.01, 0.01]) * scale ** 2 / 10
+        self.state = self.transition @ self.state
+        self.state[2:4] = np.maximum(self.state[2:4], 1.0)
+        self.covariance = self.transition @ self.covariance @ self.transition.T + process_noise
+
+    def update(self, box, confidence: float):
+        scale = max(self.state[2], self.state[3], 1.0)
+        measurement_noise = np.eye(4) * (0.05 * scale) ** 2
+        innovation = xyxy_to_cxcywh(box) - self.observation @ self.state
+        innovation_covariance = self.observation @ self.covariance @ self.observation.T + measurement_noise
+        gain = self.covariance @ self.observation.T @ np.linalg.inv(innovation_covariance)
+        self.state = self.state + gain @ innovation
+        self.covariance = (np.eye(8) - gain @ self.observation) @ self.covariance
+        self.confidence = confidence
+        self.misses = 0
+
+    def box(self):
+        return cxcywh_to_xyxy(self.state)
+
+class IoUTracker:
+    def __init__(self, iou_threshold: float = 0.3, max_misses: int = 2):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.tracks = []
+        self.next_id = 1
+
+    def predict(self):
+        for track in self.tracks:
+            track.predict()
+
+    def update(self, boxes, confidences, classes):
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        classes = np.asarray(classes, dtype=np.int64).reshape(-1)
+
+        unmatched_tracks = set(range(len(self.tracks)))
+        unmatched_detections = set(range(len(boxes)))
+        if self.tracks and len(boxes):
+            track_boxes = np.stack([t.box() for t in self.tracks])
+            track_classes = np.array([t.class_id for t in self.tracks])
+            iou = box_iou(track_boxes, boxes) * (track_classes[:, None] == classes[None, :])
+            for flat in np.argsort(-iou, axis=None):
+                t, d = np.unravel_index(flat, iou.shape)
+                if iou[t, d] < self.iou_threshold:
+                    break
+                if t in unmatched_tracks and d in unmatched_detections:
+                    self.tracks[t].update(boxes[d], float(confidences[d]))
+                    unmatched_tracks.discard(t)
+                    unmatched_detections.discard(d)
+
+        for t in unmatched_tracks:
+            self.tracks[t].misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        for d in sorted(unmatched_detections):
+            self.tracks.append(KalmanBoxTrack(self.next_id, boxes[d], float(confidences[d]), int(classes[d])))
+            self.next_id += 1
+
+    def step(self, detections=None):
+        self.predict()
+        if detections is not None:
+            self.update(*detections)
+        return [(t.id, t.box(), t.confidence, t.class_id) for t in self.tracks]
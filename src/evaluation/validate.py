@@ -1,37 +1,174 @@
+import cv2
+import sys
+import time
 import argparse
 from pathlib import Path
-from ultralytics import YOLO
 
-def run_validation(weights_path: Path, data_config_path: Path):
-    model = YOLO(weights_path)
-    
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from evaluation.backends import BACKENDS, load_model
+from evaluation.metrics import evaluate_detections, matched_ground_truth
+from evaluation.sliced_inference import SlicedModel, MERGE_MODES
+from evaluation.evaluate import split_dirs
+from common.instrumentation import span, install
+from common.yolo_labels import load_label_dir
+
+IMAGE_EXTENSIONS = ['.jpg', '.webp', '.png']
+
+SMALL_OBJECT_AREA = 32 * 32
+
+def run_validation(weights_path: Path, data_config_path: Path, backend: str = 'pytorch', device: str = None):
+    model = load_model(weights_path, backend)
+
     metrics = model.val(
         data=str(data_config_path),
         split='test',
         imgsz=640,
-        batch=8
+        batch=8,
+        device=device
     )
-    
+
+    return metrics
+
+def compare_backends(weights_path: Path, data_config_path: Path, backends, device: str = None):
+    rows = []
+    for backend in backends:
+        with span('validate.backend', backend=backend):
+            metrics = run_validation(weights_path, data_config_path, backend, device)
+        latency = sum(metrics.speed.values())
+        rows.append({
+            'backend': backend,
+            'map50': metrics.box.map50,
+            'map50_95': metrics.box.map,
+            'inference_ms': metrics.speed['inference'],
+            'latency_ms': latency,
+            'images_per_s': 1000 / latency if latency > 0 else 0.0
+        })
+
+    print(f"{'backend':<14} {'mAP50':>7} {'mAP50-95':>9} {'infer ms':>9} {'total ms':>9} {'img/s':>7}")
+    for row in rows:
+        print(f"{row['backend']:<14} {row['map50']:>7.3f} {row['map50_95']:>9.3f} {row['inference_ms']:>9.1f} "
+              f"{row['latency_ms']:>9.1f} {row['images_per_s']:>7.1f}")
+    return rows
+
+def evaluate_model(model, images_dir: Path, labels_dir: Path, conf: float = 0.001):
+    labels = load_label_dir(labels_dir, len(model.names))
+    records = []
+    small_found, small_total = 0, 0
+    seconds = 0.0
+    images = sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    for image_path in images:
+        image = cv2.imread(str(image_path))
+        if image is None:
+            continue
+        started = time.perf_counter()
+        with span('validate.predict_image') as trace:
+            boxes = model.predict([image], imgsz=640, conf=conf, verbose=False)[0].boxes
+            trace.add('images')
+        seconds += time.perf_counter() - started
+
+        pred_boxes, pred_conf, pred_cls = boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy()
+        gt_boxes, gt_cls = labels.boxes(image_path.stem, image.shape[1], image.shape[0])
+        records.append((pred_boxes, pred_conf, pred_cls, gt_boxes, gt_cls))
+
+        small = (gt_boxes[:, 2:] - gt_boxes[:, :2]).prod(axis=1) < SMALL_OBJECT_AREA
+        keep = pred_conf >= 0.25
+        small_found += int(matched_ground_truth(pred_boxes[keep], pred_cls[keep], gt_boxes[small], gt_cls[small]).sum())
+        small_total += int(small.sum())
+
+    metrics = evaluate_detections(records, num_classes=len(model.names))
+    metrics['small_recall'] = small_found / small_total if small_total else float('nan')
+    metrics['ms_per_image'] = 1000 * seconds / max(len(records), 1)
     return metrics
 
+def compare_sliced(weights_path: Path, data_config_path: Path, backend: str = 'pytorch', sliced_options: dict = None):
+    images_dir, labels_dir, _ = split_dirs(data_config_path, 'test')
+    model = load_model(weights_path, backend)
+    sliced_model = SlicedModel(model, **(sliced_options or {}))
+
+    rows = [('full frame', evaluate_model(model, images_dir, labels_dir), 0.0)]
+    rows.append(('sliced', evaluate_model(sliced_model, images_dir, labels_dir), sliced_model.tiles_per_frame()))
+
+    print(f"small objects: area < {SMALL_OBJECT_AREA} px, recall at IoU 0.5 and conf 0.25")
+    print(f"{'mode':<11} {'mAP50':>7} {'mAP50-95':>9} {'small rec':>10} {'tiles':>6} {'ms/img':>8}")
+    for name, metrics, tiles in rows:
+        print(f"{name:<11} {metrics['map50']:>7.3f} {metrics['map50_95']:>9.3f} {metrics['small_recall']:>10.3f} "
+              f"{tiles:>6.1f} {metrics['ms_per_image']:>8.1f}")
+    return rows
+
 if __name__ == '__main__':
     PROJECT_ROOT = Path(__file__).resolve().parents[2]
-    
+    install('validate')
+
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        '--weights', 
-        type=Path, 
+        '--weights',
+        type=Path,
         default=PROJECT_ROOT / "runs/detect/yolov11m_food_exp_hpo/weights/best.pt"
     )
     parser.add_argument(
-        '--data', 
-        type=Path, 
+        '--data',
+        type=Path,
         default=PROJECT_ROOT / "data/processed/dataset.yaml"
     )
-    
+    parser.add_argument(
+        '--backend',
+        nargs='+',
+        choices=BACKENDS,
+        default=['pytorch']
+    )
+    parser.add_argument(
+        '--device',
+        default=None
+    )
+    parser.add_argument(
+        '--sliced',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--tile',
+        type=int,
+        default=640
+    )
+    parser.add_argument(
+        '--overlap',
+        type=float,
+        default=0.2
+    )
+    parser.add_argument(
+        '--merge',
+        choices=MERGE_MODES,
+        default='nms'
+    )
+    parser.add_argument(
+        '--coarse',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--max-tiles',
+        type=int,
+        default=None
+    )
+
     args = parser.parse_args()
-    
-    run_validation(
-        weights_path=args.weights, 
-        data_config_path=args.data
-    )
\ No newline at end of file
+
+    if args.sliced:
+        compare_sliced(
+            weights_path=args.weights,
+            data_config_path=args.data,
+            backend=args.backend[0],
+            sliced_options={
+                'tile': args.tile,
+                'overlap': args.overlap,
+                'merge': args.merge,
+                'coarse': args.coarse,
+                'max_tiles': args.max_tiles
+            }
+        )
+    else:
+        compare_backends(
+            weights_path=args.weights,
+            data_config_path=args.data,
+            backends=args.backend,
+            device=args.device
+        )
@@ -0,0 +1,225 @@
+import cv2
+import time
+import numpy as np
+import queue
+import threading
+import statistics
+from pathlib import Path
+
+from evaluation.tracking import IoUTracker
+from common.instrumentation import span
+
+VIDEO_EXTENSIONS = ['.mov', '.mp4', '.avi', '.mkv']
+
+_END = object()
+
+def is_video(source: Path) -> bool:
+    return source.is_file() and source.suffix.lower() in VIDEO_EXTENSIONS
+
+class StageStats:
+    def __init__(self):
+        self.items = 0
+        self.seconds = 0.0
+
+    def add(self, seconds: float, items: int = 1):
+        self.items += items
+        self.seconds += seconds
+
+    def ms_per_item(self) -> float:
+        return 1000 * self.seconds / self.items if self.items else 0.0
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+class VideoPipeline:
+    def __init__(self, model, imgsz=640, conf=0.5, batch_size=4, queue_size=16):
+        self.model = model
+        self.imgsz = imgsz
+        self.conf = conf
+        self.batch_size = max(batch_size, 1)
+        self.queue_size = queue_size
+
+    def infer(self, frames):
+        return self.model.predict(frames, imgsz=self.imgsz, conf=self.conf, verbose=False)
+
+    def should_detect(self, frame_index: int, frame) -> bool:
+        return True
+
+    def render(self, frame, result):
+        return result.plot()
+
+    def run(self, source: Path, output_path: Path):
+        cap = cv2.VideoCapture(str(source))
+        if not cap.isOpened():
+            raise IOError(f"Cannot open video {source}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        frames_queue = queue.Queue(maxsize=self.queue_size)
+        results_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+        stats = {'decode': StageStats(), 'infer': StageStats(), 'encode': StageStats()}
+        detected_frames = []
+        latencies = []
+
+        def guarded(stage):
+            def run_stage():
+                try:
+                    stage()
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+            return run_stage
+
+        def decode():
+            try:
+                frame_index = 0
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    ok, frame = cap.read()
+                    if not ok:
+                        break
+                    detect = self.should_detect(frame_index, frame)
+                    stats['decode'].add(time.perf_counter() - started)
+                    if not _put(frames_queue, (started, frame, detect), stop):
+                        break
+                    frame_index += 1
+            finally:
+                cap.release()
+                _put(frames_queue, _END, stop)
+
+        def infer():
+            finished = False
+            while not finished:
+                item = _get(frames_queue, stop)
+                if item is _END:
+                    break
+                batch = [item]
+                while len(batch) < self.batch_size:
+                    try:
+                        item = frames_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _END:
+                        finished = True
+                        break
+                    batch.append(item)
+
+                to_detect = [frame for _, frame, detect in batch if detect]
+                results = []
+                if to_detect:
+                    started = time.perf_counter()
+                    with span('video.infer_batch') as trace:
+                        results = self.infer(to_detect)
+                        trace.add('frames', len(to_detect))
+                    stats['infer'].add(time.perf_counter() - started, len(to_detect))
+                    detected_frames.append(len(to_detect))
+                results = iter(results)
+                for decoded_at, frame, detect in batch:
+                    result = next(results) if detect else None
+                    if not _put(results_queue, (decoded_at, frame, result), stop):
+                        return
+            _put(results_queue, _END, stop)
+
+        def encode():
+            writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+            try:
+                while True:
+                    item = _get(results_queue, stop)
+                    if item is _END:
+                        break
+                    decoded_at, frame, result = item
+                    started = time.perf_counter()
+                    writer.write(self.render(frame, result))
+                    finished_at = time.perf_counter()
+                    stats['encode'].add(finished_at - started)
+                    latencies.append(finished_at - decoded_at)
+            finally:
+                writer.release()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=guarded(stage), daemon=True) for stage in (decode, infer, encode)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if errors:
+            raise errors[0]
+
+        return {
+            'frames': len(latencies),
+            'detected_frames': sum(detected_frames),
+            'seconds': elapsed,
+            'fps': len(latencies) / elapsed if elapsed > 0 else 0.0,
+            'stage_ms': {name: stage.ms_per_item() for name, stage in stats.items()},
+            'latency_ms_p50': 1000 * statistics.median(latencies) if latencies else 0.0,
+            'latency_ms_max': 1000 * max(latencies) if latencies else 0.0,
+            'output': str(output_path)
+        }
+
+class TrackingVideoPipeline(VideoPipeline):
+    def __init__(self, model, imgsz=640, conf=0.5, batch_size=4, queue_size=16,
+                 detect_every=5, motion_threshold=None, iou_threshold=0.3, max_misses=2):
+        super().__init__(model, imgsz=imgsz, conf=conf, batch_size=batch_size, queue_size=queue_size)
+        self.detect_every = max(detect_every, 1)
+        self.motion_threshold = motion_threshold
+        self.tracker = IoUTracker(iou_threshold=iou_threshold, max_misses=max_misses)
+        self.last_detected_index = None
+        self.last_thumbnail = None
+        self.names = getattr(model, 'names', {})
+
+    def should_detect(self, frame_index: int, frame) -> bool:
+        thumbnail = None
+        if self.motion_threshold is not None:
+            thumbnail = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (64, 36), interpolation=cv2.INTER_AREA)
+        detect = self.last_detected_index is None or frame_index - self.last_detected_index >= self.detect_every
+        if not detect and thumbnail is not None:
+            motion = np.abs(thumbnail.astype(np.int16) - self.last_thumbnail.astype(np.int16)).mean()
+            detect = motion > self.motion_threshold
+        if detect:
+            self.last_detected_index = frame_index
+            self.last_thumbnail = thumbnail
+        return detect
+
+    def track(self, result):
+        detections = None
+        if result is not None:
+            boxes = result.boxes
+            detections = (boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy())
+        return self.tracker.step(detections)
+
+    def render(self, frame, result):
+        annotated = frame.copy()
+        for track_id, box, confidence, class_id in self.track(result):
+            x1, y1, x2, y2 = [int(v) for v in box]
+            color = tuple(int(c) for c in np.random.default_rng(track_id).integers(64, 256, 3))
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
+            label = f"#{track_id} {self.names.get(class_id, class_id)} {confidence:.2f}"
+            cv2.putText(annotated, label, (x1, max(y1 - 6, 12)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        return annotated
+
+def print_pipeline_report(report: dict):
+    print(f"{report['frames']} frames in {report['seconds']:.1f} s, {report['fps']:.1f} FPS end-to-end")
+    print(f"  detector ran on {report['detected_frames']} frames")
+    for name, ms in report['stage_ms'].items():
+        print(f"  {name:<7} {ms:8.1f} ms/frame")
+    print(f"  latency p50 {report['latency_ms_p50']:.1f} ms, max {report['latency_ms_max']:.1f} ms")
+    print(f"Saved to {report['output']}")
@@ -0,0 +1,278 @@
+import os
+import cv2
+import sys
+import hashlib
+import argparse
+import numpy as np
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+from tqdm import tqdm
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from data_preparation.split_engine import SPLIT_NAMES, SPLIT_MANIFEST_NAME
+from common.instrumentation import span, install
+from common.yolo_labels import load_label_dir
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+PACKED_DIR_NAME = "packed"
+INDEX_NAME = "index.npz"
+IMAGE_EXTENSIONS = ['.jpg', '.webp', '.png']
+
+def source_signature(path: Path):
+    if not path.exists():
+        return (0, 0)
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+def dataset_state(processed_dir: Path) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    manifest_path = processed_dir / SPLIT_MANIFEST_NAME
+    if manifest_path.exists():
+        digest.update(manifest_path.read_bytes())
+    for kind in ("images", "labels"):
+        for split_name in SPLIT_NAMES:
+            directory = processed_dir / kind / split_name
+            if not directory.exists():
+                continue
+            for path in sorted(directory.iterdir()):
+                if path.name.startswith('.'):
+                    continue
+                digest.update(f"{path.name}:{source_signature(path)}".encode())
+    return digest.hexdigest()
+
+def load_resized(image_path: Path, imgsz: int):
+    image = cv2.imread(str(image_path))
+    if image is None:
+        raise IOError(f"Cannot read image {image_path}")
+    h0, w0 = image.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        size = (min(round(w0 * r), imgsz), min(round(h0 * r), imgsz))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA if r < 1 else cv2.INTER_LINEAR)
+    return np.ascontiguousarray(image), (h0, w0)
+
+class PackedSplit:
+    def __init__(self, store_dir: Path):
+        self.store_dir = store_dir
+        with np.load(store_dir / INDEX_NAME) as index:
+            self.index = {key: index[key] for key in index.files}
+        self.imgsz = int(self.index['imgsz'])
+        self.state = str(self.index['state'])
+        self.offsets = self.index['offsets']
+        self.shapes = self.index['shapes']
+        self.orig_shapes = self.index['orig_shapes']
+        self.label_offsets = self.index['label_offsets']
+        self.cls = self.index['cls']
+        self.bboxes = self.index['bboxes']
+        self.signatures = self.index['signatures']
+        self.im_files = [str(f) for f in self.index['im_files']]
+        self.images_path = store_dir / str(self.index['images_file'])
+        self.images = np.memmap(self.images_path, dtype=np.uint8, mode='c') if self.offsets[-1] else None
+
+    def __len__(self):
+        return len(self.im_files)
+
+    def image(self, i: int):
+        h, w = self.shapes[i]
+        return self.images[self.offsets[i]:self.offsets[i + 1]].reshape(h, w, 3)
+
+    def labels(self, i: int):
+        start, end = self.label_offsets[i], self.label_offsets[i + 1]
+        return self.cls[start:end], self.bboxes[start:end]
+
+    def close(self):
+        self.images = None
+
+def pack_split(images_dir: Path, labels_dir: Path, store_dir: Path, imgsz: int, state: str, workers: int = 8,
+               reuse: bool = True):
+    store_dir.mkdir(parents=True, exist_ok=True)
+    image_files = sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    label_files = [labels_dir / f"{p.stem}.txt" for p in image_files]
+    signatures = np.array([source_signature(p) + source_signature(l) for p, l in zip(image_files, label_files)],
+                          dtype=np.int64).reshape(-1, 4)
+
+    previous = None
+    if reuse and (store_dir / INDEX_NAME).exists():
+        previous = PackedSplit(store_dir)
+        if previous.imgsz != imgsz:
+            previous.close()
+            previous = None
+    reusable = {}
+    if previous is not None:
+        reusable = {f: i for i, f in enumerate(previous.im_files)}
+
+    def load(i):
+        j = reusable.get(str(image_files[i]))
+        if j is not None and tuple(previous.signatures[j][:2]) == tuple(signatures[i][:2]):
+            return previous.image(j), tuple(previous.orig_shapes[j]), True
+        image, orig_shape = load_resized(image_files[i], imgsz)
+        return image, orig_shape, False
+
+    images_file = f"images_{state[:16]}.u8"
+    temporary = store_dir / f".{images_file}.tmp"
+    offsets, shapes, orig_shapes = [0], [], []
+    stats = {'images': len(image_files), 'reused': 0, 'decoded': 0}
+    with open(temporary, 'wb') as f, ThreadPool(max(workers, 1)) as pool:
+        results = pool.imap(load, range(len(image_files)), chunksize=4)
+        for image, orig_shape, reused in tqdm(results, total=len(image_files), desc=f"Packing {store_dir.name}", unit="img"):
+            f.write(image.tobytes())
+            offsets.append(offsets[-1] + image.nbytes)
+            shapes.append(image.shape[:2])
+            orig_shapes.append(orig_shape)
+            stats['reused' if reused else 'decoded'] += 1
+
+    label_set = load_label_dir(labels_dir)
+    labels = [(rows[:, :1], rows[:, 1:]) for rows in (label_set.get(p.stem) for p in image_files)]
+    label_offsets = np.cumsum([0] + [len(cls) for cls, _ in labels])
+    if previous is not None:
+        previous.close()
+    os.replace(temporary, store_dir / images_file)
+
+    index_temporary = store_dir / f".{INDEX_NAME}.tmp.npz"
+    np.savez(
+        index_temporary,
+        imgsz=imgsz,
+        state=state,
+        images_file=images_file,
+        im_files=np.array([str(p) for p in image_files]),
+        signatures=signatures,
+        offsets=np.array(offsets, dtype=np.int64),
+        shapes=np.array(shapes, dtype=np.int32).reshape(-1, 2),
+        orig_shapes=np.array(orig_shapes, dtype=np.int32).reshape(-1, 2),
+        label_offsets=label_offsets.astype(np.int64),
+        cls=np.concatenate([cls for cls, _ in labels]) if labels else np.zeros((0, 1), dtype=np.float32),
+        bboxes=np.concatenate([boxes for _, boxes in labels]) if labels else np.zeros((0, 4), dtype=np.float32)
+    )
+    os.replace(index_temporary, store_dir / INDEX_NAME)
+
+    for stale in store_dir.glob("images_*.u8"):
+        if stale.name != images_file:
+            stale.unlink()
+    stats['bytes'] = offsets[-1]
+    return stats
+
+def pack_dataset(processed_dir: Path, imgsz: int = 640, workers: int = 8, force: bool = False):
+    state = dataset_state(processed_dir)
+    packed_dir = processed_dir / PACKED_DIR_NAME
+    for split_name in SPLIT_NAMES:
+        images_dir = processed_dir / "images" / split_name
+        if not images_dir.exists():
+            continue
+        store_dir = packed_dir / split_name
+        if not force and (store_dir / INDEX_NAME).exists():
+            packed = PackedSplit(store_dir)
+            current = packed.state == state and packed.imgsz == imgsz
+            packed.close()
+            if current:
+                print(f"'{split_name}' pack is up to date")
+                continue
+        with span('train.pack_split', split=split_name) as trace:
+            stats = pack_split(images_dir, processed_dir / "labels" / split_name, store_dir, imgsz, state, workers,
+                               reuse=not force)
+            for key, value in stats.items():
+                trace.add(key, value)
+        print(f"'{split_name}': {stats['images']} images ({stats['reused']} reused, {stats['decoded']} decoded), "
+              f"{stats['bytes'] / 1e6:.1f} MB")
+    return packed_dir
+
+def packed_store_for(img_path) -> Path:
+    img_path = Path(img_path)
+    return img_path.parents[1] / PACKED_DIR_NAME / img_path.name
+
+class PackedYOLODataset(YOLODataset):
+    def __init__(self, *args, store_dir: Path = None, **kwargs):
+        self.packed = PackedSplit(store_dir)
+        super().__init__(*args, **kwargs)
+        if self.packed.imgsz != self.imgsz:
+            raise ValueError(f"{store_dir} was packed for imgsz={self.packed.imgsz}, training uses imgsz={self.imgsz}")
+
+    def get_img_files(self, img_path):
+        return self.packed.im_files[:round(len(self.packed) * self.fraction)]
+
+    def get_labels(self):
+        labels = []
+        for i, im_file in enumerate(self.im_files):
+            cls, bboxes = self.packed.labels(i)
+            labels.append({
+                'im_file': im_file,
+                'shape': tuple(int(v) for v in self.packed.orig_shapes[i]),
+                'cls': cls,
+                'bboxes': bboxes,
+                'segments': [],
+                'keypoints': None,
+                'normalized': True,
+                'bbox_format': 'xywh'
+            })
+        return labels
+
+    def load_image(self, i, rect_mode=True):
+        image = self.packed.image(i)
+        orig_shape = tuple(int(v) for v in self.packed.orig_shapes[i])
+        if not rect_mode and image.shape[:2] != (self.imgsz, self.imgsz):
+            image = cv2.resize(image, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+        elif self.augment:
+            image = np.array(image)
+        if self.augment:
+            self.buffer.append(i)
+            if len(self.buffer) >= self.max_buffer_length:
+                self.buffer.pop(0)
+        return image, orig_shape, image.shape[:2]
+
+def build_packed_dataset(cfg, img_path, batch, data, mode: str = 'train', rect: bool = False, stride: int = 32):
+    return PackedYOLODataset(
+        img_path=img_path,
+        imgsz=cfg.imgsz,
+        batch_size=batch,
+        augment=mode == 'train',
+        hyp=cfg,
+        rect=cfg.rect or rect,
+        cache=None,
+        single_cls=cfg.single_cls or False,
+        stride=int(stride),
+        pad=0.0 if mode == 'train' else 0.5,
+        prefix=colorstr(f"{mode}: "),
+        task=cfg.task,
+        classes=cfg.classes,
+        data=data,
+        fraction=cfg.fraction if mode == 'train' else 1.0,
+        store_dir=packed_store_for(img_path)
+    )
+
+class PackedDetectionTrainer(DetectionTrainer):
+    def build_dataset(self, img_path, mode='train', batch=None):
+        model = getattr(self.model, 'module', self.model)
+        stride = max(int(model.stride.max() if model else 0), 32)
+        return build_packed_dataset(self.args, img_path, batch, self.data, mode=mode, rect=mode == 'val', stride=stride)
+
+if __name__ == '__main__':
+    install('packed_dataset')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--data-dir',
+        type=Path,
+        default=PROJECT_ROOT / "data/processed"
+    )
+    parser.add_argument(
+        '--imgsz',
+        type=int,
+        default=640
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true'
+    )
+
+    args = parser.parse_args()
+
+    pack_dataset(args.data_dir, imgsz=args.imgsz, workers=args.workers, force=args.force)
@@ -0,0 +1,42 @@
+import math
+import yaml
+import random
+from pathlib import Path
+
+DEFAULT_SEARCH_SPACE = {
+    'optimizer': ['choice', ['SGD', 'AdamW']],
+    'lr0': ['loguniform', 1e-4, 1e-2],
+    'lrf': ['uniform', 0.01, 0.3],
+    'momentum': ['uniform', 0.8, 0.98],
+    'weight_decay': ['loguniform', 1e-5, 1e-3],
+    'scale': ['uniform', 0.2, 0.9],
+    'translate': ['uniform', 0.0, 0.3],
+    'degrees': ['uniform', 0.0, 10.0],
+    'fliplr': ['uniform', 0.0, 0.5],
+    'hsv_s': ['uniform', 0.3, 0.9],
+    'hsv_v': ['uniform', 0.2, 0.6],
+    'mosaic': ['uniform', 0.5, 1.0],
+    'mixup': ['uniform', 0.0, 0.2]
+}
+
+def load_search_space(path: Path = None):
+    if path is None:
+        return dict(DEFAULT_SEARCH_SPACE)
+    with open(path, 'r') as f:
+        space = yaml.safe_load(f)
+    for name, spec in space.items():
+        if spec[0] not in ('choice', 'uniform', 'loguniform'):
+            raise ValueError(f"Unknown distribution '{spec[0]}' for '{name}'")
+    return space
+
+def sample_params(space: dict, rng: random.Random):
+    params = {}
+    for name, spec in sorted(space.items()):
+        kind = spec[0]
+        if kind == 'choice':
+            params[name] = rng.choice(spec[1])
+        elif kind == 'uniform':
+            params[name] = round(rng.uniform(spec[1], spec[2]), 6)
+        else:
+            params[name] = float(f"{math.exp(rng.uniform(math.log(spec[1]), math.log(spec[2]))):.3g}")
+    return params
@@ -1,66 +1,36 @@
-import yaml
+import sys
+import argparse
 from pathlib import Path
-from ultralytics import YOLO
 
-def download_file(url: str, destination: Path):
-    if destination.exists():
-        return
+sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-    import requests
-    from tqdm import tqdm
+from training.training_core import load_train_config, run_training, DEFAULT_CONFIG
+from common.instrumentation import install
 
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    
-    total_size = int(response.headers.get('content-length', 0))
-    block_size = 1024
-    
-    with open(destination, 'wb') as f, tqdm(
-        total=total_size, unit='iB', unit_scale=True, desc=destination.name
-    ) as pbar:
-        for data in response.iter_content(block_size):
-            f.write(data)
-            pbar.update(len(data))
+def train_model(config_path: Path = DEFAULT_CONFIG, overrides=None, fresh: bool = False):
+    config = load_train_config(config_path, overrides)
+    return run_training(config, fresh=fresh)
 
-def train_model():
-    project_root = Path(__file__).resolve().parents[2]
-    
-    model_name = 'yolov11m.pt'
-    model_url = f'https://github.com/ultralytics/assets/releases/download/v8.3.0/yolo11m.pt'
-    model_path = project_root / model_name
-    
-    download_file(model_url, model_path)
-
-    processed_data_dir = project_root / "data/processed"
-    
-    dataset_config = {
-        'path': str(processed_data_dir.resolve()),
-        'train': 'images/train',
-        'val': 'images/val',
-        'test': 'images/test',
-        'names': {
-            0: 'full_plate',
-            1: 'empty_plate',
-            2: 'cutlery',
-            3: 'glass'
-        }
-    }
-    
-    config_path = processed_data_dir / "dataset.yaml"
-    with open(config_path, 'w') as f:
-        yaml.dump(dataset_config, f, default_flow_style=False)
-
-    model = YOLO(model_path)
+if __name__ == '__main__':
+    install('train')
 
-    results = model.train(
-        data=str(config_path),
-        epochs=100,
-        imgsz=640,
-        batch=8,
-        name='yolov11m_food_exp1'
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--config',
+        type=Path,
+        default=DEFAULT_CONFIG
+    )
+    parser.add_argument(
+        '--set',
+        nargs='*',
+        default=[],
+        metavar='KEY=VALUE'
+    )
+    parser.add_argument(
+        '--fresh',
+        action='store_true'
     )
-    
-    return results
 
-if __name__ == '__main__':
-    train_model()
\ No newline at end of file
+    args = parser.parse_args()
+
+    train_model(args.config, args.set, args.fresh)
@@ -1,63 +1,258 @@
-import yaml
+import os
+import sys
+import time
+import queue
+import random
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from pathlib import Path
-from ultralytics import YOLO
-
-def download_file(url: str, destination: Path):
-    if destination.exists():
-        return
-
-    import requests
-    from tqdm import tqdm
-
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    
-    total_size = int(response.headers.get('content-length', 0))
-    block_size = 1024
-    
-    with open(destination, 'wb') as f, tqdm(
-        total=total_size, unit='iB', unit_scale=True, desc=destination.name
-    ) as pbar:
-        for data in response.iter_content(block_size):
-            f.write(data)
-            pbar.update(len(data))
-
-def train_hpo_model():
-    project_root = Path(__file__).resolve().parents[2]
-    
-    model_name = 'yolov11m.pt'
-    model_url = f'https://github.com/ultralytics/assets/releases/download/v8.3.0/yolo11m.pt'
-    model_path = project_root / model_name
-    
-    download_file(model_url, model_path)
-
-    processed_data_dir = project_root / "data/processed"
-    
-    dataset_config = {
-        'path': str(processed_data_dir.resolve()),
-        'train': 'images/train',
-        'val': 'images/val',
-        'test': 'images/test',
-        'names': { 0: 'full_plate', 1: 'empty_plate', 2: 'cutlery', 3: 'glass' }
-    }
-    
-    config_path = processed_data_dir / "dataset.yaml"
-    with open(config_path, 'w') as f:
-        yaml.dump(dataset_config, f, default_flow_style=False)
-
-    model = YOLO(model_path)
-
-    results = model.train(
-        data=str(config_path),
-        epochs=100,
-        imgsz=640,
-        batch=8,
-        name='yolov11m_food_exp_hpo',
-        scale=0.6,
-        translate=0.2
-    )
-    
-    return results
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from training.training_core import load_train_config, prepare_training, run_training
+from training.search_space import load_search_space, sample_params
+from training.trial_store import TrialStore, TRIAL_DB_NAME
+from common.instrumentation import span, install
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+DEFAULT_HPO_CONFIG = PROJECT_ROOT / "configs/train_hpo.yaml"
+
+REPORT_SORT_KEYS = ['efficiency', 'map50_95', 'map50']
+CPU_TRIAL_THREADS = 4
+
+def default_devices():
+    import torch
+    count = torch.cuda.device_count()
+    if count:
+        return [str(i) for i in range(count)]
+    return ['cpu'] * max(1, (os.cpu_count() or 1) // CPU_TRIAL_THREADS)
+
+def rung_epochs(rung: int, min_epochs: int, eta: int) -> int:
+    return min_epochs * eta ** rung
+
+def trial_run_dir(study: str, trial_id: int, rung: int) -> Path:
+    return PROJECT_ROOT / "runs/hpo" / study / f"trial_{trial_id:03d}_rung_{rung}"
+
+def run_trial(config: dict, params: dict, epochs: int, device: str, workers: int, study: str, name: str,
+              weights: Path = None):
+    started = time.perf_counter()
+    config = dict(config, epochs=epochs, name=name, project=f"runs/hpo/{study}")
+    if weights is not None:
+        params = dict(params, warmup_epochs=0)
+    if device == 'cpu':
+        import torch
+        torch.set_num_threads(workers)
+    try:
+        metrics = run_training(config, device=device, workers=workers, plots=False, weights=weights, **params)
+        return {'map50': float(metrics.box.map50), 'map50_95': float(metrics.box.map),
+                'seconds': time.perf_counter() - started}
+    except Exception as e:
+        return {'error': repr(e), 'seconds': time.perf_counter() - started}
+
+def launch_trials(store: TrialStore, study: str, trials: dict, pending, rung: int, epochs: int, devices,
+                  config: dict, previous_epochs: int = 0):
+    free_devices = queue.Queue()
+    for device in devices:
+        free_devices.put(device)
+    workers = max(1, (os.cpu_count() or 1) // len(devices))
+    context = multiprocessing.get_context('spawn')
+
+    def run(trial_id):
+        weights = trial_run_dir(study, trial_id, rung - 1) / "weights" / "last.pt" if rung else None
+        if weights is not None and not weights.exists():
+            print(f"trial {trial_id}: no {weights}, training rung {rung} from scratch")
+            weights = None
+        extra_epochs = epochs - previous_epochs if weights else epochs
+        device = free_devices.get()
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_trial, config, trials[trial_id], extra_epochs, device, workers, study,
+                                     trial_run_dir(study, trial_id, rung).name, weights).result()
+            return device, result
+        finally:
+            free_devices.put(device)
+
+    with ThreadPoolExecutor(max_workers=len(devices)) as pool:
+        futures = {pool.submit(run, trial_id): trial_id for trial_id in pending}
+        for future in as_completed(futures):
+            trial_id = futures[future]
+            device, result = future.result()
+            store.record(study, trial_id, rung, epochs, device, result)
+            if result.get('error'):
+                print(f"trial {trial_id} rung {rung} failed on {device}: {result['error']}")
+            else:
+                print(f"trial {trial_id} rung {rung} ({epochs} epochs, {device}): "
+                      f"mAP50-95 {result['map50_95']:.3f} in {result['seconds'] / 60:.1f} min")
+
+def successive_halving(store: TrialStore, study: str, trials: dict, rungs: int, min_epochs: int, eta: int,
+                       devices, config: dict):
+    survivors = sorted(trials)
+    for rung in range(rungs):
+        epochs = rung_epochs(rung, min_epochs, eta)
+        previous_epochs = rung_epochs(rung - 1, min_epochs, eta) if rung else 0
+        done, failed = store.completed(study, rung), store.failed(study, rung)
+        pending = [t for t in survivors if t not in done and t not in failed]
+        print(f"rung {rung}: {len(survivors)} trials at {epochs} epochs, {len(pending)} to run")
+        if pending:
+            with span('hpo.rung', rung=rung, epochs=epochs) as trace:
+                launch_trials(store, study, trials, pending, rung, epochs, devices, config, previous_epochs)
+                trace.add('trials', len(pending))
+
+        done = store.completed(study, rung)
+        ranked = sorted((t for t in survivors if t in done), key=lambda t: -done[t])
+        if rung == rungs - 1 or len(ranked) <= 1:
+            return ranked
+        survivors = ranked[:max(1, len(ranked) // eta)]
+    return survivors
+
+def print_report(store: TrialStore, study: str, sort_key: str = 'efficiency', top: int = 20):
+    rows = store.results(study)
+    spent = {}
+    for row in sorted(rows, key=lambda row: (row['trial_id'], row['rung'])):
+        spent[row['trial_id']] = spent.get(row['trial_id'], 0.0) + row['seconds']
+        row['seconds'] = spent[row['trial_id']]
+    for row in rows:
+        hours = row['seconds'] / 3600
+        row['efficiency'] = row['map50_95'] / hours if hours > 0 else 0.0
+    rows.sort(key=lambda row: -row[sort_key])
+
+    print(f"{'trial':>5} {'rung':>4} {'epochs':>6} {'mAP50':>7} {'mAP50-95':>9} {'hours':>6} {'mAP/h':>7}  params")
+    for row in rows[:top]:
+        params = " ".join(f"{k}={v}" for k, v in sorted(row['params'].items()))
+        print(f"{row['trial_id']:>5} {row['rung']:>4} {row['epochs']:>6} {row['map50']:>7.3f} {row['map50_95']:>9.3f} "
+              f"{row['seconds'] / 3600:>6.2f} {row['efficiency']:>7.3f}  {params}")
+    return rows
+
+def train_hpo_model(
+    config_path: Path = DEFAULT_HPO_CONFIG,
+    overrides=None,
+    study: str = 'food_hpo',
+    num_trials: int = 27,
+    min_epochs: int = 3,
+    eta: int = 3,
+    rungs: int = 3,
+    devices=None,
+    space_path: Path = None,
+    seed: int = 0,
+    final_epochs: int = 100,
+    fresh: bool = False
+):
+    config = load_train_config(config_path, overrides)
+    prepare_training(config)
+
+    space = load_search_space(space_path)
+    devices = devices or default_devices()
+    with TrialStore(PROJECT_ROOT / "runs/hpo" / TRIAL_DB_NAME) as store:
+        trials = store.trial_params(study)
+        for trial_id in range(len(trials), num_trials):
+            store.add_trial(study, trial_id, sample_params(space, random.Random(seed * 100003 + trial_id)))
+        trials = store.trial_params(study)
+
+        ranked = successive_halving(store, study, trials, rungs, min_epochs, eta, devices, config)
+        print_report(store, study)
+        if not ranked:
+            print("No trial finished, nothing to train")
+            return None
+        best_params = trials[ranked[0]]
+
+    print(f"Best trial {ranked[0]}: {best_params}")
+    if final_epochs <= 0:
+        return best_params
+
+    return run_training(dict(config, epochs=final_epochs), fresh=fresh, device=devices[0], **best_params)
 
 if __name__ == '__main__':
-    train_hpo_model()
\ No newline at end of file
+    install('train_hpo')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--config',
+        type=Path,
+        default=DEFAULT_HPO_CONFIG
+    )
+    parser.add_argument(
+        '--set',
+        nargs='*',
+        default=[],
+        metavar='KEY=VALUE'
+    )
+    parser.add_argument(
+        '--study',
+        default='food_hpo'
+    )
+    parser.add_argument(
+        '--trials',
+        type=int,
+        default=27
+    )
+    parser.add_argument(
+        '--min-epochs',
+        type=int,
+        default=3
+    )
+    parser.add_argument(
+        '--eta',
+        type=int,
+        default=3
+    )
+    parser.add_argument(
+        '--rungs',
+        type=int,
+        default=3
+    )
+    parser.add_argument(
+        '--devices',
+        nargs='+',
+        default=None
+    )
+    parser.add_argument(
+        '--space',
+        type=Path,
+        default=None
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0
+    )
+    parser.add_argument(
+        '--final-epochs',
+        type=int,
+        default=100
+    )
+    parser.add_argument(
+        '--fresh',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--report',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--sort',
+        choices=REPORT_SORT_KEYS,
+        default='efficiency'
+    )
+
+    args = parser.parse_args()
+
+    if args.report:
+        with TrialStore(PROJECT_ROOT / "runs/hpo" / TRIAL_DB_NAME) as store:
+            print_report(store, args.study, args.sort)
+    else:
+        train_hpo_model(
+            config_path=args.config,
+            overrides=args.set,
+            study=args.study,
+            num_trials=args.trials,
+            min_epochs=args.min_epochs,
+            eta=args.eta,
+            rungs=args.rungs,
+            devices=args.devices,
+            space_path=args.space,
+            seed=args.seed,
+            final_epochs=args.final_epochs,
+            fresh=args.fresh
+        )
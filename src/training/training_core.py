@@ -0,0 +1,248 @@
+import sys
+import copy
+import json
+import time
+import yaml
+import hashlib
+import zipfile
+from pathlib import Path
+from ultralytics import YOLO
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from training.packed_dataset import pack_dataset, PackedDetectionTrainer
+from common.instrumentation import span, traced, record_span, enabled
+from common.yolo_labels import load_class_names
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+DEFAULT_CONFIG = PROJECT_ROOT / "configs/train.yaml"
+RUN_RECORD_NAME = "run_config.json"
+CPU_IMAGE_BYTES = 1024 ** 3
+AUTO_BATCH_FRACTION = 0.6
+
+def set_option(config: dict, assignment: str):
+    key, _, value = assignment.partition('=')
+    target = config
+    *parents, leaf = key.split('.')
+    for parent in parents:
+        target = target.setdefault(parent, {})
+    target[leaf] = yaml.safe_load(value)
+
+def load_train_config(config_path: Path = DEFAULT_CONFIG, overrides=None):
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    for assignment in overrides or []:
+        set_option(config, assignment)
+    return config
+
+def file_sha256(path: Path, block_size: int = 4 * 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _fetch(url: str, partial: Path):
+    import requests
+    from tqdm import tqdm
+
+    offset = partial.stat().st_size if partial.exists() else 0
+    headers = {'Range': f"bytes={offset}-"} if offset else {}
+    response = requests.get(url, stream=True, headers=headers)
+    if response.status_code == 416:
+        return
+    response.raise_for_status()
+    if response.status_code != 206:
+        offset = 0
+
+    total_size = offset + int(response.headers.get('content-length', 0))
+    block_size = 1024 * 1024
+
+    with open(partial, 'ab' if offset else 'wb') as f, tqdm(
+        total=total_size, initial=offset, unit='iB', unit_scale=True, desc=partial.name
+    ) as pbar:
+        for data in response.iter_content(block_size):
+            f.write(data)
+            pbar.update(len(data))
+
+def checkpoint_intact(path: Path) -> bool:
+    if not zipfile.is_zipfile(path):
+        return False
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return archive.testzip() is None
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+def verified(path: Path, sha256: str) -> bool:
+    if sha256 is None:
+        return checkpoint_intact(path)
+    return file_sha256(path) == sha256
+
+def download_file(url: str, destination: Path, sha256: str = None):
+    sidecar = destination.with_name(f"{destination.name}.sha256")
+    if sha256 is None and sidecar.exists():
+        sha256 = sidecar.read_text().strip()
+    if sha256 is None:
+        print(f"No SHA-256 configured for {destination.name}, checking archive integrity only")
+
+    if destination.exists():
+        if verified(destination, sha256):
+            if not sidecar.exists():
+                sidecar.write_text(file_sha256(destination))
+            return
+        print(f"{destination.name} failed verification, downloading again")
+        destination.unlink()
+
+    partial = destination.with_name(f"{destination.name}.part")
+    for attempt in range(2):
+        _fetch(url, partial)
+        if verified(partial, sha256):
+            digest = file_sha256(partial)
+            partial.replace(destination)
+            sidecar.write_text(digest)
+            return
+        partial.unlink()
+    raise IOError(f"{destination.name} failed verification" + (f": expected SHA-256 {sha256}" if sha256 else ""))
+
+def write_dataset_config(data_dir: Path, class_names) -> Path:
+    dataset_config = {
+        'path': str(data_dir.resolve()),
+        'train': 'images/train',
+        'val': 'images/val',
+        'test': 'images/test',
+        'names': dict(enumerate(class_names))
+    }
+    text = yaml.dump(dataset_config, default_flow_style=False)
+
+    config_path = data_dir / "dataset.yaml"
+    if not config_path.exists() or config_path.read_text() != text:
+        config_path.write_text(text)
+    return config_path
+
+@traced('train.prepare')
+def prepare_training(config: dict):
+    model_config = config['model']
+    model_path = PROJECT_ROOT / model_config['name']
+    download_file(model_config['url'], model_path, model_config.get('sha256'))
+
+    data_dir = PROJECT_ROOT / config['data_dir']
+    config_path = write_dataset_config(data_dir, load_class_names(PROJECT_ROOT / config['classes']))
+    if config.get('packed', True):
+        pack_dataset(data_dir, imgsz=config['imgsz'])
+    return model_path, config_path
+
+def checkpoint_state(run_dir: Path):
+    last = run_dir / "weights" / "last.pt"
+    if not last.exists():
+        return None, False
+
+    import torch
+    checkpoint = torch.load(last, map_location='cpu', weights_only=False)
+    return last, checkpoint.get('epoch', -1) == -1
+
+def cpu_batch(imgsz: int, nbs: int) -> int:
+    import psutil
+    per_image = CPU_IMAGE_BYTES * (imgsz / 640) ** 2
+    batch = int(psutil.virtual_memory().available * AUTO_BATCH_FRACTION // per_image)
+    return max(1, min(batch, nbs))
+
+def resolve_batch(batch, device, imgsz: int = 640, nbs: int = 64):
+    if batch != 'auto':
+        return batch
+    import torch
+    if str(device).lower() == 'cpu' or not torch.cuda.is_available():
+        batch = cpu_batch(imgsz, nbs)
+        print(f"batch: auto on CPU, using batch {batch} for the available RAM")
+        return batch
+    return -1
+
+def train_arguments(config: dict, config_path: Path):
+    device = (config.get('train_args') or {}).get('device')
+    arguments = {
+        'data': str(config_path),
+        'epochs': config['epochs'],
+        'imgsz': config['imgsz'],
+        'batch': resolve_batch(config.get('batch', 'auto'), device, config['imgsz'], config.get('nbs', 64)),
+        'nbs': config.get('nbs', 64),
+        'amp': config.get('amp', True),
+        'project': str(PROJECT_ROOT / config.get('project', "runs/detect")),
+        'name': config['name'],
+        'exist_ok': True
+    }
+    if config.get('packed', True):
+        arguments['trainer'] = PackedDetectionTrainer
+    arguments.update(config.get('train_args') or {})
+    return arguments
+
+def run_fingerprint(arguments: dict) -> str:
+    settings = {key: value.__name__ if isinstance(value, type) else value for key, value in arguments.items()
+                if key not in ('project', 'name', 'exist_ok', 'device', 'workers')}
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def recorded_fingerprint(run_dir: Path):
+    record_path = run_dir / RUN_RECORD_NAME
+    if not record_path.exists():
+        return None
+    with open(record_path, 'r') as f:
+        return json.load(f).get('fingerprint')
+
+def add_run_record(model, fingerprint: str, arguments: dict):
+    def on_pretrain_routine_start(trainer):
+        record = {'fingerprint': fingerprint,
+                  'arguments': {k: v.__name__ if isinstance(v, type) else v for k, v in arguments.items()}}
+        Path(trainer.save_dir).mkdir(parents=True, exist_ok=True)
+        with open(Path(trainer.save_dir) / RUN_RECORD_NAME, 'w') as f:
+            json.dump(record, f, indent=2, default=str)
+
+    model.add_callback('on_pretrain_routine_start', on_pretrain_routine_start)
+
+def add_epoch_spans(model):
+    if not enabled():
+        return
+    started = {}
+
+    def on_epoch_start(trainer):
+        started['epoch'] = time.perf_counter()
+
+    def on_epoch_end(trainer):
+        record_span('train.epoch', (time.perf_counter() - started.pop('epoch', time.perf_counter())) * 1000,
+                    {'images': len(trainer.train_loader.dataset)}, epoch=trainer.epoch)
+
+    model.add_callback('on_train_epoch_start', on_epoch_start)
+    model.add_callback('on_train_epoch_end', on_epoch_end)
+
+def run_training(config: dict, fresh: bool = False, weights: Path = None, **params):
+    config = copy.deepcopy(config)
+    config.setdefault('train_args', {}).update(params)
+    model_path, config_path = prepare_training(config)
+    arguments = train_arguments(config, config_path)
+    fingerprint = run_fingerprint(dict(arguments, weights=str(weights)) if weights else arguments)
+    run_dir = Path(arguments['project']) / arguments['name']
+    if not fresh and (run_dir / "weights" / "last.pt").exists() and recorded_fingerprint(run_dir) != fingerprint:
+        arguments['name'] = f"{arguments['name']}_{fingerprint[:8]}"
+        print(f"{run_dir} was trained with different settings, using {arguments['name']}")
+        run_dir = Path(arguments['project']) / arguments['name']
+
+    last, finished = (None, False) if fresh else checkpoint_state(run_dir)
+    if finished:
+        print(f"{run_dir} already finished, validating {run_dir / 'weights' / 'best.pt'}")
+        return YOLO(run_dir / "weights" / "best.pt").val(data=arguments['data'], imgsz=arguments['imgsz'],
+                                                          project=arguments['project'], name=f"{arguments['name']}_val",
+                                                          exist_ok=True)
+    if last is not None:
+        print(f"Resuming {run_dir} from {last}")
+        model = YOLO(last)
+        add_run_record(model, fingerprint, arguments)
+        add_epoch_spans(model)
+        with span('train.run', name=arguments['name'], resumed=True):
+            return model.train(resume=True, trainer=arguments.get('trainer'))
+
+    if fresh:
+        arguments['exist_ok'] = False
+    model = YOLO(weights or model_path)
+    add_run_record(model, fingerprint, arguments)
+    add_epoch_spans(model)
+    with span('train.run', name=arguments['name'], resumed=False):
+        return model.train(**arguments)
@@ -0,0 +1,86 @@
+import json
+import sqlite3
+from pathlib import Path
+
+TRIAL_DB_NAME = "trials.sqlite"
+
+class TrialStore:
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS trials (
+                study TEXT NOT NULL,
+                trial_id INTEGER NOT NULL,
+                params TEXT NOT NULL,
+                PRIMARY KEY (study, trial_id)
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                study TEXT NOT NULL,
+                trial_id INTEGER NOT NULL,
+                rung INTEGER NOT NULL,
+                epochs INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                device TEXT,
+                map50 REAL,
+                map50_95 REAL,
+                seconds REAL,
+                error TEXT,
+                PRIMARY KEY (study, trial_id, rung)
+            );
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def trial_params(self, study: str):
+        rows = self.conn.execute("SELECT trial_id, params FROM trials WHERE study = ?", (study,)).fetchall()
+        return {trial_id: json.loads(params) for trial_id, params in rows}
+
+    def add_trial(self, study: str, trial_id: int, params: dict):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO trials (study, trial_id, params) VALUES (?, ?, ?)",
+                (study, trial_id, json.dumps(params, sort_keys=True))
+            )
+
+    def completed(self, study: str, rung: int):
+        rows = self.conn.execute(
+            "SELECT trial_id, map50_95 FROM results WHERE study = ? AND rung = ? AND status = 'done'",
+            (study, rung)
+        ).fetchall()
+        return dict(rows)
+
+    def failed(self, study: str, rung: int):
+        rows = self.conn.execute(
+            "SELECT trial_id FROM results WHERE study = ? AND rung = ? AND status = 'failed'", (study, rung)
+        ).fetchall()
+        return {trial_id for trial_id, in rows}
+
+    def record(self, study: str, trial_id: int, rung: int, epochs: int, device: str, result: dict):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results "
+                "(study, trial_id, rung, epochs, status, device, map50, map50_95, seconds, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (study, trial_id, rung, epochs, 'failed' if result.get('error') else 'done', device,
+                 result.get('map50'), result.get('map50_95'), result.get('seconds'), result.get('error'))
+            )
+
+    def results(self, study: str):
+        rows = self.conn.execute(
+            "SELECT r.trial_id, r.rung, r.epochs, r.device, r.map50, r.map50_95, r.seconds, t.params "
+            "FROM results r JOIN trials t ON t.study = r.study AND t.trial_id = r.trial_id "
+            "WHERE r.study = ? AND r.status = 'done'",
+            (study,)
+        ).fetchall()
+        keys = ('trial_id', 'rung', 'epochs', 'device', 'map50', 'map50_95', 'seconds', 'params')
+        return [dict(zip(keys, row[:-1] + (json.loads(row[-1]),))) for row in rows]
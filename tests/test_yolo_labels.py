@@ -0,0 +1,19 @@
+import sys
+import numpy as np
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from common.yolo_labels import parse_labels, parse_label_texts
+
+def test_misaligned_lines_are_reported_not_merged():
+    text = "0 0.5 0.5 0.1\n1 0.5 0.5 0.1 0.1 0.2\n"
+    rows, issues = parse_labels(text, 4)
+    assert rows.shape == (0, 5)
+    assert issues == [(1, "expected 5 values, got 4"), (2, "expected 5 values, got 6")]
+    assert parse_label_texts([text], 4)[0][1] == issues
+
+def test_valid_lines_use_bulk_path():
+    rows, issues = parse_labels("0 0.5 0.5 0.1 0.1\n\n3 0.25 0.25 0.1 0.1\n", 4)
+    assert issues == []
+    np.testing.assert_allclose(rows[:, 0], [0, 3])